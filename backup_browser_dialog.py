@@ -0,0 +1,100 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QCheckBox, QTreeView, QPlainTextEdit, QSplitter, QMessageBox)
+from PyQt6.QtCore import Qt
+from note_tree_model import NoteTreeModel
+from translations import TRANSLATIONS
+
+
+class BackupBrowserDialog(QDialog):
+    """
+    Просмотр заметок бэкапа и копирование выбранных заметок в текущую базу
+
+    Бэкап должен быть подключён к базе через NotesDB.attach_backup.
+    Текущая база данных при этом не закрывается и не заменяется.
+    """
+
+    def __init__(self, parent, db, snapshot_path):
+        super().__init__(parent)
+        self.main_window = parent
+        self.current_language = self.main_window.current_language
+        self.db = db
+        self.snapshot_path = snapshot_path
+        # ID копий, созданных в текущей базе
+        self.copied_ids = []
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса"""
+        tr = TRANSLATIONS[self.current_language]
+        self.setWindowTitle(tr['action_restore_notes'])
+        layout = QVBoxLayout(self)
+
+        splitter = QSplitter(Qt.Orientation.Horizontal)
+
+        # Дерево заметок бэкапа (ветки подгружаются при раскрытии)
+        self.tree = QTreeView()
+        self.tree.setHeaderHidden(True)
+        self.tree.setUniformRowHeights(True)
+        self.tree_model = NoteTreeModel(self.db, self, schema='backup')
+        self.tree_model.reload()
+        self.tree.setModel(self.tree_model)
+        self.tree.selectionModel().currentChanged.connect(self.on_current_changed)
+        splitter.addWidget(self.tree)
+
+        # Содержимое выбранной заметки в бэкапе
+        self.preview = QPlainTextEdit()
+        self.preview.setReadOnly(True)
+        splitter.addWidget(self.preview)
+        splitter.setSizes([250, 450])
+        layout.addWidget(splitter)
+
+        self.with_children_check = QCheckBox(tr['restore_notes_with_children'])
+        self.with_children_check.setChecked(True)
+        layout.addWidget(self.with_children_check)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        buttons = QHBoxLayout()
+        self.copy_button = QPushButton(tr['restore_notes_copy'])
+        self.copy_button.setEnabled(False)
+        self.copy_button.clicked.connect(self.copy_selected)
+        close_button = QPushButton(tr['restore_notes_close'])
+        close_button.clicked.connect(self.accept)
+        buttons.addWidget(self.copy_button)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+        self.resize(760, 480)
+
+    def select_note(self, note_id):
+        """Выбор заметки бэкапа по ID (ветки, ведущие к ней, подгружаются)"""
+        index = self.tree_model.index_for_note(note_id, load=True)
+        if index.isValid():
+            self.tree.setCurrentIndex(index)
+            self.tree.scrollTo(index)
+
+    def on_current_changed(self, current, previous):
+        """Показ содержимого выбранной заметки бэкапа"""
+        note_id = self.tree_model.note_id(current)
+        self.copy_button.setEnabled(note_id is not None)
+        if note_id is None:
+            self.preview.clear()
+            return
+        note = self.db.get_note(note_id, schema='backup')
+        self.preview.setPlainText((note['content'] or "") if note else "")
+
+    def copy_selected(self):
+        """Копирование выбранной заметки (и вложенных) в текущую базу"""
+        note_id = self.tree_model.note_id(self.tree.currentIndex())
+        if note_id is None:
+            return
+        tr = TRANSLATIONS[self.current_language]
+        try:
+            new_id = self.db.copy_from_backup(
+                self.snapshot_path, note_id, with_children=self.with_children_check.isChecked()).result()
+        except Exception as e:
+            QMessageBox.critical(self, tr['error_title'], tr['restore_notes_failed'] + f": {str(e)}")
+            return
+        self.copied_ids.append(new_id)
+        self.status_label.setText(tr['restore_notes_done'] + self.tree_model.data(self.tree.currentIndex()))
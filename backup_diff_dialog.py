@@ -0,0 +1,139 @@
+import os
+import difflib
+from contextlib import ExitStack
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QComboBox, QTreeWidget, QTreeWidgetItem, QTextBrowser, QMessageBox)
+from PyQt6.QtCore import Qt
+from translations import TRANSLATIONS
+
+
+class BackupDiffDialog(QDialog):
+    """
+    Сравнение двух бэкапов (или бэкапа и текущей базы данных)
+
+    Показывает добавленные, удалённые, перемещённые, переименованные и
+    изменённые заметки. Двойной щелчок открывает построчное сравнение заметки.
+    """
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.main_window = parent
+        self.current_language = self.main_window.current_language
+        self.backup_manager = self.main_window.backup_manager
+        self.db = self.main_window.db
+        # Временные копии бэкапов и соединения с ними живут, пока открыт диалог
+        self.snapshots = ExitStack()
+        self.connections = {}  # Путь к бэкапу (None — текущая база) -> соединение
+        self.old_conn = None
+        self.new_conn = None
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса"""
+        tr = TRANSLATIONS[self.current_language]
+        self.setWindowTitle(tr['action_backup_diff'])
+        layout = QVBoxLayout(self)
+
+        # Сравниваемые версии: текущая база и бэкапы из каталога (от новых к старым)
+        self.old_combo = QComboBox()
+        self.new_combo = QComboBox()
+        for combo in (self.old_combo, self.new_combo):
+            combo.addItem(tr['diff_live_db'], None)
+            for entry in self.backup_manager.get_backup_catalog():
+                combo.addItem(self.main_window.db_manager.describe_backup_entry(entry),
+                              os.path.join(self.backup_manager.backup_dir, entry['name']))
+        if self.old_combo.count() > 1:
+            self.old_combo.setCurrentIndex(1)
+
+        for label, combo in ((tr['diff_old'], self.old_combo), (tr['diff_new'], self.new_combo)):
+            row = QHBoxLayout()
+            row.addWidget(QLabel(label))
+            row.addWidget(combo, 1)
+            layout.addLayout(row)
+
+        compare_button = QPushButton(tr['diff_compare'])
+        compare_button.clicked.connect(self.compare)
+        layout.addWidget(compare_button)
+
+        self.results = QTreeWidget()
+        self.results.setRootIsDecorated(False)
+        self.results.setUniformRowHeights(True)
+        self.results.setHeaderLabels([tr['diff_col_change'], tr['diff_col_note'], 'ID'])
+        self.results.setColumnWidth(0, 220)
+        self.results.setColumnWidth(1, 300)
+        self.results.itemDoubleClicked.connect(self.show_note_diff)
+        layout.addWidget(self.results)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        self.resize(760, 520)
+
+    def connection(self, backup_path):
+        """Соединение только для чтения с бэкапом или с текущей базой (backup_path=None)"""
+        conn = self.connections.get(backup_path)
+        if conn is None:
+            if backup_path is None:
+                conn = self.backup_manager.connect_snapshot(self.db.db_path)
+            else:
+                snapshot_path = self.snapshots.enter_context(self.backup_manager.open_backup(backup_path))
+                conn = self.backup_manager.connect_snapshot(snapshot_path, immutable=True)
+            self.connections[backup_path] = conn
+        return conn
+
+    def compare(self):
+        """Сравнение выбранных версий"""
+        tr = TRANSLATIONS[self.current_language]
+        self.results.clear()
+        try:
+            if None in (self.old_combo.currentData(), self.new_combo.currentData()):
+                # Сравнение с текущей базой учитывает изменения, ещё стоящие в очереди записи
+                self.db.writer.flush()
+            self.old_conn = self.connection(self.old_combo.currentData())
+            self.new_conn = self.connection(self.new_combo.currentData())
+            changes = self.backup_manager.diff_snapshots(self.old_conn, self.new_conn)
+        except Exception as e:
+            QMessageBox.critical(self, tr['error_title'], tr['diff_failed'] + f": {str(e)}")
+            return
+
+        items = []
+        for note_id, kinds, old_title, new_title in changes:
+            change = ', '.join(tr['diff_' + kind] for kind in ('added', 'removed', 'moved', 'renamed', 'edited')
+                               if kind in kinds)
+            if 'renamed' in kinds:
+                title = f"{old_title} → {new_title}"
+            else:
+                title = new_title if new_title is not None else old_title
+            item = QTreeWidgetItem([change, title, str(note_id)])
+            item.setData(0, Qt.ItemDataRole.UserRole, note_id)
+            items.append(item)
+        self.results.addTopLevelItems(items)
+        self.status_label.setText(tr['diff_summary'] + str(len(changes)))
+
+    def show_note_diff(self, item, column):
+        """Построчное сравнение двух версий заметки"""
+        tr = TRANSLATIONS[self.current_language]
+        note_id = item.data(0, Qt.ItemDataRole.UserRole)
+        old_note = self.backup_manager.read_note(self.old_conn, note_id)
+        new_note = self.backup_manager.read_note(self.new_conn, note_id)
+        old_lines = (old_note['content'] or '').splitlines() if old_note else []
+        new_lines = (new_note['content'] or '').splitlines() if new_note else []
+        html = difflib.HtmlDiff(wrapcolumn=60).make_file(
+            old_lines, new_lines, self.old_combo.currentText(), self.new_combo.currentText())
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle(tr['diff_note_title'] + item.text(1))
+        layout = QVBoxLayout(dialog)
+        browser = QTextBrowser()
+        browser.setHtml(html)
+        layout.addWidget(browser)
+        dialog.resize(900, 600)
+        dialog.exec()
+
+    def done(self, result):
+        # Соединения и временные копии бэкапов освобождаются при закрытии диалога
+        for conn in self.connections.values():
+            conn.close()
+        self.connections = {}
+        self.snapshots.close()
+        super().done(result)
@@ -1,9 +1,32 @@
 import os
-import shutil
-from datetime import datetime, timedelta
+import sqlite3
+import threading
+import configparser
+import hashlib
+import json
+import tempfile
+import zlib
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from urllib.request import pathname2url
 import atexit
+import bisect
 
 class BackupManager:
+    # Количество страниц базы данных, копируемых за один шаг резервного копирования.
+    # Между шагами блокировка базы снимается, и запись в неё не останавливается
+    BACKUP_PAGES = 256
+    # Бэкапы хранятся как список фрагментов файла базы данных фиксированного размера.
+    # Каждый фрагмент сжимается и записывается один раз (имя — его SHA-256), поэтому
+    # новый бэкап добавляет только фрагменты с изменёнными страницами
+    CHUNK_SIZE = 64 * 1024
+    MANIFEST_EXT = '.manifest'
+    # Каталог бэкапов: сведения о каждом бэкапе, собранные при его создании
+    CATALOG_FILE = 'catalog.sqlite'
+    # Префикс временных копий баз данных в системной временной папке
+    TEMP_PREFIX = 'skimnote-'
+
     def __init__(self, base_dir):
         """
         Инициализация менеджера бэкапов
@@ -13,22 +36,44 @@ class BackupManager:
         """
         self.base_dir = base_dir
         self.backup_dir = os.path.join(base_dir, "backup")
+        self.chunks_dir = os.path.join(self.backup_dir, "chunks")
+        self.catalog_path = os.path.join(self.backup_dir, self.CATALOG_FILE)
         
         # Создаем папку backup, если её нет
         if not os.path.exists(self.backup_dir):
             os.makedirs(self.backup_dir)
+        
+        # Бэкапы создаются по одному (в том числе вызванные напрямую, а не через start_backup)
+        self.create_lock = threading.Lock()
+        # Выполняющийся фоновый бэкап
+        self.backup_lock = threading.Lock()
+        self.backup_future = None
+        self.cancel_event = threading.Event()
+        self.active_source = None  # Соединение, с которого сейчас снимается копия
     
-    def create_backup(self, db_path=None):
+    def create_backup(self, db_path=None, progress=None, compact=False):
         """
         Создание бэкапа базы данных
         
+        Копия снимается через SQLite (backup API или VACUUM INTO), поэтому
+        она согласована даже при одновременной записи в базу и включает
+        изменения, ещё не перенесённые из журнала WAL. Затем копия разбивается
+        на фрагменты, в хранилище добавляются только новые из них, и
+        записывается манифест бэкапа.
+        
         Args:
             db_path (str, optional): Путь к файлу базы данных. 
                                    Если не указан, ищет .db файлы в base_dir
+            progress (callable, optional): Вызывается как progress(скопировано, всего) в страницах
+            compact (bool): Создать сжатую копию через VACUUM INTO (без свободных страниц)
         
         Returns:
             str: Путь к созданному бэкапу или None в случае ошибки
         """
+        with self.create_lock:
+            return self._create_backup(db_path, progress, compact)
+    
+    def _create_backup(self, db_path, progress, compact):
         try:
             # Если путь к БД не указан, ищем .db файлы в base_dir
             if db_path is None:
@@ -46,14 +91,25 @@ class BackupManager:
             
             # Создаем имя файла бэкапа с временной меткой
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"{db_file}_{timestamp}.db"
+            backup_filename = f"{db_file}_{timestamp}{self.MANIFEST_EXT}"
             backup_path = os.path.join(self.backup_dir, backup_filename)
             
-            # Копируем файл базы данных
-            shutil.copy2(db_path, backup_path)
+            # Снимаем согласованную копию во временный файл и сохраняем её фрагменты.
+            # Манифест записывается последним, поэтому в списке бэкапов нет неполных копий.
+            # Копия создаётся в локальной временной папке: на носитель бэкапов
+            # записываются только новые фрагменты, а не вся база
+            temp_path = self.temp_database_path(backup_filename)
+            try:
+                self.copy_database(db_path, temp_path, progress, compact)
+                note_count, integrity = self.inspect_snapshot(temp_path, cancellable=True)
+                manifest = self.store_snapshot(temp_path, backup_path, db_file, note_count, integrity)
+                self.add_to_catalog(backup_filename, manifest)
+            finally:
+                self.remove_database_file(temp_path)
             
-            # Очищаем старые бэкапы
-            self.cleanup_old_backups(db_file)
+            # Очищаем старые бэкапы (при прерывании — в следующий раз)
+            if not self.cancel_event.is_set():
+                self.cleanup_old_backups(db_file)
             
             return backup_path
             
@@ -61,27 +117,668 @@ class BackupManager:
             print(f"Ошибка при создании бэкапа: {e}")
             return None
     
-    def cleanup_old_backups(self, db_name, max_days=10):
+    def temp_database_path(self, name):
+        """Путь к временной копии базы данных в системной временной папке (уникален для процесса и потока)"""
+        return os.path.join(tempfile.gettempdir(),
+                            f"{self.TEMP_PREFIX}{os.getpid()}.{threading.get_ident()}.{name}.tmp")
+    
+    def chunk_path(self, digest):
+        """Путь к файлу фрагмента в хранилище"""
+        return os.path.join(self.chunks_dir, digest[:2], digest + '.z')
+    
+    def check_cancelled(self):
+        """Прерывание бэкапа, если вызван cancel_backup"""
+        if self.cancel_event.is_set():
+            raise InterruptedError("бэкап прерван")
+    
+    def store_snapshot(self, snapshot_path, manifest_path, db_name, note_count=None, integrity=None):
         """
-        Удаление старых бэкапов
+        Сохранение копии базы данных в хранилище фрагментов
+        
+        При прерывании бэкапа записанные новые фрагменты удаляются, а манифест
+        не создаётся.
         
         Args:
+            snapshot_path (str): Путь к согласованной копии базы данных
+            manifest_path (str): Путь к создаваемому манифесту
             db_name (str): Имя файла базы данных (без пути)
-            max_days (int): Максимальное количество дней хранения бэкапов
+            note_count (int, optional): Количество заметок в копии
+            integrity (str, optional): Результат PRAGMA integrity_check для копии
+        
+        Returns:
+            dict: Записанный манифест
+        """
+        chunks = []
+        written = []  # Новые фрагменты этого бэкапа (удаляются при прерывании)
+        size = 0
+        checksum = hashlib.sha256()
+        try:
+            with open(snapshot_path, 'rb') as f:
+                while True:
+                    self.check_cancelled()
+                    data = f.read(self.CHUNK_SIZE)
+                    if not data:
+                        break
+                    checksum.update(data)
+                    digest = hashlib.sha256(data).hexdigest()
+                    path = self.chunk_path(digest)
+                    if not os.path.exists(path):
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        with open(path + '.tmp', 'wb') as out:
+                            out.write(zlib.compress(data))
+                        os.replace(path + '.tmp', path)
+                        written.append(path)
+                    chunks.append(digest)
+                    size += len(data)
+        except InterruptedError:
+            for path in written:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"Ошибка при удалении фрагмента {os.path.basename(path)}: {e}")
+            raise
+        
+        manifest = {
+            'database': db_name,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'size': size,
+            'note_count': note_count,
+            'checksum': checksum.hexdigest(),
+            'integrity': integrity,
+            'chunk_size': self.CHUNK_SIZE,
+            'chunks': chunks,
+        }
+        with open(manifest_path + '.part', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(manifest_path + '.part', manifest_path)
+        return manifest
+    
+    def inspect_snapshot(self, snapshot_path, cancellable=False):
+        """
+        Проверка копии базы данных
+        
+        Args:
+            snapshot_path (str): Путь к копии
+            cancellable (bool): Проверка выполняется при создании бэкапа и прерывается cancel_backup
+        
+        Returns:
+            tuple: (количество заметок или None, результат PRAGMA integrity_check)
+        """
+        if cancellable:
+            self.check_cancelled()
+        uri = 'file:' + pathname2url(os.path.abspath(snapshot_path)) + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True)
+        if cancellable:
+            # SQLite периодически вызывает обработчик и прерывает запрос после cancel_backup
+            conn.set_progress_handler(self.cancel_event.is_set, 10000)
+        try:
+            try:
+                integrity = conn.execute('PRAGMA integrity_check').fetchone()[0]
+            except sqlite3.OperationalError:
+                if cancellable:
+                    self.check_cancelled()
+                raise
+            try:
+                note_count = conn.execute('SELECT COUNT(*) FROM notes WHERE id != 1').fetchone()[0]
+            except sqlite3.DatabaseError:
+                note_count = None
+            return note_count, integrity
+        finally:
+            conn.close()
+    
+    def open_catalog(self):
+        """Соединение с каталогом бэкапов (каждый вызов — новое соединение, безопасно из любого потока)"""
+        conn = sqlite3.connect(self.catalog_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS backups (
+                name TEXT PRIMARY KEY,
+                database TEXT,
+                created TEXT,
+                size INTEGER,
+                note_count INTEGER,
+                checksum TEXT,
+                integrity TEXT
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_backups_created ON backups (created)')
+        return conn
+    
+    def add_to_catalog(self, name, info, conn=None):
+        """Запись сведений о бэкапе в каталог"""
+        own_conn = conn is None
+        conn = conn or self.open_catalog()
+        try:
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO backups (name, database, created, size, note_count, checksum, integrity) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (name, info.get('database'), info.get('created'), info.get('size'),
+                     info.get('note_count'), info.get('checksum'), info.get('integrity'))
+                )
+        finally:
+            if own_conn:
+                conn.close()
+    
+    def describe_backup(self, backup_path):
+        """
+        Сбор сведений о бэкапе, которого нет в каталоге
+        
+        Для бэкапов из фрагментов сведения берутся из манифеста.
+        Полные копии (.db) проверяются один раз, после чего сведения хранятся в каталоге.
+        """
+        name = os.path.basename(backup_path)
+        if name.endswith(self.MANIFEST_EXT):
+            manifest = self.read_manifest(backup_path)
+            if manifest.get('checksum') is None:
+                with self.open_backup(backup_path) as snapshot_path:
+                    manifest['note_count'], manifest['integrity'] = self.inspect_snapshot(snapshot_path)
+                    manifest['checksum'] = self.file_checksum(snapshot_path)
+            return manifest
+        
+        note_count, integrity = self.inspect_snapshot(backup_path)
+        # Имя полной копии: <имя базы>_<дата>_<время>.db
+        database, date, time = (name[:-len('.db')].rsplit('_', 2) + ['', ''])[:3]
+        try:
+            created = datetime.strptime(date + time, "%Y%m%d%H%M%S")
+        except ValueError:
+            database = name
+            created = datetime.fromtimestamp(os.path.getmtime(backup_path))
+        return {
+            'database': database,
+            'created': created.isoformat(timespec='seconds'),
+            'size': os.path.getsize(backup_path),
+            'note_count': note_count,
+            'checksum': self.file_checksum(backup_path),
+            'integrity': integrity,
+        }
+    
+    def file_checksum(self, path):
+        """SHA-256 содержимого файла"""
+        checksum = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for data in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                checksum.update(data)
+        return checksum.hexdigest()
+    
+    def sync_catalog(self, conn):
+        """
+        Согласование каталога с папкой бэкапов
+        
+        Файлы бэкапов не изменяются после создания, поэтому достаточно сравнить
+        имена: записи удалённых файлов убираются, новые файлы добавляются.
+        """
+        names = {name for name in os.listdir(self.backup_dir)
+                 if name.endswith((".db", self.MANIFEST_EXT))}
+        known = {row['name'] for row in conn.execute('SELECT name FROM backups')}
+        with conn:
+            conn.executemany('DELETE FROM backups WHERE name = ?', [(name,) for name in known - names])
+        for name in names - known:
+            try:
+                self.add_to_catalog(name, self.describe_backup(os.path.join(self.backup_dir, name)), conn)
+            except Exception as e:
+                print(f"Ошибка при чтении бэкапа {name}: {e}")
+    
+    def get_backup_catalog(self, db_name=None):
+        """
+        Получение сведений о бэкапах из каталога
+        
+        Args:
+            db_name (str, optional): Имя файла базы данных для фильтрации
+        
+        Returns:
+            list: Строки каталога (name, database, created, size, note_count,
+                  checksum, integrity), от новых к старым
+        """
+        try:
+            conn = self.open_catalog()
+            try:
+                self.sync_catalog(conn)
+                if db_name is None:
+                    return conn.execute('SELECT * FROM backups ORDER BY created DESC, name DESC').fetchall()
+                return conn.execute(
+                    'SELECT * FROM backups WHERE database = ? ORDER BY created DESC, name DESC', (db_name,)
+                ).fetchall()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Ошибка при чтении каталога бэкапов: {e}")
+            return []
+    
+    def read_manifest(self, manifest_path):
+        """Чтение манифеста бэкапа"""
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f)
+    
+    def extract_snapshot(self, manifest_path, target_path):
+        """
+        Сборка файла базы данных из фрагментов бэкапа
+        
+        Фрагменты читаются и распаковываются по одному, поэтому память
+        не зависит от размера базы. Содержимое каждого фрагмента проверяется
+        по его хешу.
+        """
+        with open(target_path, 'wb') as out:
+            for data in self.snapshot_chunks(manifest_path):
+                out.write(data)
+    
+    def snapshot_chunks(self, manifest_path):
+        """Генератор распакованных фрагментов бэкапа по порядку (каждый проверяется по хешу)"""
+        for digest in self.read_manifest(manifest_path)['chunks']:
+            with open(self.chunk_path(digest), 'rb') as f:
+                data = zlib.decompress(f.read())
+            if hashlib.sha256(data).hexdigest() != digest:
+                raise ValueError(f"фрагмент {digest} повреждён")
+            yield data
+    
+    def connect_in_memory(self, manifest_path):
+        """
+        Соединение с копией бэкапа из фрагментов, собранной в памяти
+        
+        Файлы на диск не записываются. Требуется Python 3.11+
+        (sqlite3.Connection.deserialize), иначе используется open_backup.
+        """
+        data = bytearray()
+        for chunk in self.snapshot_chunks(manifest_path):
+            data += chunk
+        if data[18:20] == b'\x02\x02':
+            # Копия в режиме WAL не открывается из памяти — помечаем её как обычную
+            data[18:20] = b'\x01\x01'
+        conn = sqlite3.connect(':memory:')
+        conn.deserialize(data)
+        return conn
+    
+    def remove_stale_temp_files(self, max_age=24 * 60 * 60):
+        """
+        Удаление временных копий баз данных, оставшихся после аварийного завершения
+        
+        Удаляются файлы старше max_age секунд: более новые могут принадлежать
+        другому запущенному экземпляру программы.
+        """
+        now = datetime.now().timestamp()
+        temp_dir = tempfile.gettempdir()
+        # Раньше временные копии создавались в папке бэкапов
+        candidates = [os.path.join(temp_dir, name) for name in os.listdir(temp_dir)
+                      if name.startswith(self.TEMP_PREFIX)]
+        candidates += [os.path.join(self.backup_dir, name) for name in os.listdir(self.backup_dir)
+                       if '.restore.tmp' in name or self.MANIFEST_EXT + '.tmp' in name]
+        for path in candidates:
+            try:
+                if os.path.isfile(path) and now - os.path.getmtime(path) > max_age:
+                    os.remove(path)
+            except OSError as e:
+                print(f"Ошибка при удалении временного файла {os.path.basename(path)}: {e}")
+    
+    @contextmanager
+    def open_backup(self, backup_path, private=False):
+        """
+        Путь к файлу базы данных бэкапа для чтения средствами SQLite
+        
+        Бэкап из фрагментов собирается во временный файл, который удаляется
+        при выходе из блока with. Полные копии (.db) используются как есть,
+        а при private=True тоже копируются во временный файл, который можно изменять
+        (например, обновить в нём схему).
+        """
+        if not backup_path.endswith(self.MANIFEST_EXT) and not private:
+            yield backup_path
+            return
+        # Имя уникально для процесса и потока: бэкап могут одновременно читать поиск и восстановление
+        temp_path = self.temp_database_path(os.path.basename(backup_path) + '.restore')
+        try:
+            if backup_path.endswith(self.MANIFEST_EXT):
+                self.extract_snapshot(backup_path, temp_path)
+            else:
+                self.copy_database(backup_path, temp_path)
+            yield temp_path
+        finally:
+            self.remove_database_file(temp_path)
+    
+    def remove_database_file(self, path):
+        """Удаление временной базы данных вместе с файлами её журналов"""
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    
+    def backup_chunks(self, backup_path):
+        """Множество фрагментов, на которые ссылается бэкап (пустое для полных копий)"""
+        if not backup_path.endswith(self.MANIFEST_EXT):
+            return set()
+        try:
+            return set(self.read_manifest(backup_path)['chunks'])
+        except Exception as e:
+            print(f"Ошибка при чтении манифеста {os.path.basename(backup_path)}: {e}")
+            return set()
+    
+    def backups_size(self, backups):
+        """Место на диске, занимаемое набором бэкапов (общие фрагменты учитываются один раз)"""
+        total = 0
+        chunks = set()
+        for path in backups:
+            if path.endswith(self.MANIFEST_EXT):
+                chunks |= self.backup_chunks(path)
+            total += os.path.getsize(path)
+        for digest in chunks:
+            try:
+                total += os.path.getsize(self.chunk_path(digest))
+            except OSError:
+                pass
+        return total
+    
+    def collect_garbage(self):
+        """
+        Удаление фрагментов, на которые не ссылается ни один бэкап
+        
+        Используемые фрагменты собираются по всем манифестам в папке бэкапов,
+        а не по каталогу: бэкап, не попавший в каталог, тоже ссылается на
+        фрагменты. Если какой-либо манифест не читается, ничего не удаляется.
+        """
+        if not os.path.isdir(self.chunks_dir):
+            return
+        referenced = set()
+        for name in os.listdir(self.backup_dir):
+            if not name.endswith(self.MANIFEST_EXT):
+                continue
+            try:
+                referenced.update(self.read_manifest(os.path.join(self.backup_dir, name))['chunks'])
+            except Exception as e:
+                print(f"Очистка фрагментов отменена: ошибка при чтении манифеста {name}: {e}")
+                return
+        for dirpath, dirnames, filenames in os.walk(self.chunks_dir):
+            for filename in filenames:
+                if filename.endswith('.z') and filename[:-2] not in referenced:
+                    try:
+                        os.remove(os.path.join(dirpath, filename))
+                    except Exception as e:
+                        print(f"Ошибка при удалении фрагмента {filename}: {e}")
+    
+    def start_backup(self, db_path, progress=None, compact=False):
+        """
+        Создание бэкапа в фоновом потоке
+        
+        Args:
+            db_path (str): Путь к файлу базы данных
+            progress (callable, optional): Вызывается из фонового потока как progress(скопировано, всего)
+            compact (bool): Создать сжатую копию через VACUUM INTO
+        
+        Returns:
+            Future: Результат — путь к созданному бэкапу или None в случае ошибки.
+                    Если бэкап уже выполняется, возвращается его Future
+        """
+        with self.backup_lock:
+            if self.backup_future is not None and not self.backup_future.done():
+                return self.backup_future
+            future = Future()
+            self.backup_future = future
+            self.cancel_event.clear()
+        
+        def run():
+            future.set_result(self.create_backup(db_path, progress, compact))
+        
+        future.set_running_or_notify_cancel()
+        threading.Thread(target=run, name='NotesDB-backup', daemon=True).start()
+        return future
+    
+    def cancel_backup(self):
+        """
+        Прерывание выполняющегося фонового бэкапа
+        
+        Недописанная копия удаляется, Future завершается с результатом None.
+        """
+        with self.backup_lock:
+            future = self.backup_future
+            if future is None or future.done():
+                return
+            self.cancel_event.set()
+            if self.active_source is not None:
+                # Прерывает VACUUM INTO, который не проверяет флаг между шагами
+                self.active_source.interrupt()
+        future.result()
+        self.cancel_event.clear()
+    
+    def copy_database(self, source_path, target_path, progress=None, compact=False):
+        """
+        Согласованное копирование базы данных SQLite в новый файл
+        
+        Args:
+            source_path (str): Путь к исходной базе данных
+            target_path (str): Путь к копии. Для compact файл не должен существовать,
+                               иначе существующая база перезаписывается
+            progress (callable, optional): Вызывается как progress(скопировано, всего) в страницах
+            compact (bool): Копировать через VACUUM INTO вместо постраничного backup API
         """
+        # Исходная база открывается только для чтения
+        uri = 'file:' + pathname2url(os.path.abspath(source_path)) + '?mode=ro'
+        source = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        with self.backup_lock:
+            self.active_source = source
         try:
-            cutoff_date = datetime.now() - timedelta(days=max_days)
+            self.check_cancelled()
+            if compact:
+                # VACUUM INTO выполняется одной операцией, прогресс сообщается по её завершении
+                source.execute('VACUUM INTO ?', (target_path,))
+                if progress:
+                    pages = source.execute('PRAGMA page_count').fetchone()[0]
+                    progress(pages, pages)
+                return
             
-            for filename in os.listdir(self.backup_dir):
-                if filename.startswith(db_name) and filename.endswith(".db"):
-                    file_path = os.path.join(self.backup_dir, filename)
+            target = sqlite3.connect(target_path)
+            try:
+                def on_step(status, remaining, total):
+                    self.check_cancelled()
+                    if progress:
+                        progress(total - remaining, total)
+                
+                # Копирование идёт из одного снимка WAL в открытой транзакции чтения:
+                # иначе каждая запись в базу между шагами перезапускает копирование
+                # с начала. Транзакция чтения запись не блокирует
+                source.isolation_level = None
+                source.execute('BEGIN')
+                source.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchall()
+                try:
+                    source.backup(target, pages=self.BACKUP_PAGES, progress=on_step)
+                finally:
+                    source.execute('COMMIT')
+                # Копия — один самостоятельный файл, без журнала WAL
+                target.execute('PRAGMA journal_mode = DELETE')
+            finally:
+                target.close()
+        finally:
+            with self.backup_lock:
+                self.active_source = None
+            source.close()
+    
+    def connect_snapshot(self, db_path, immutable=False):
+        """
+        Соединение только для чтения с копией базы данных (или с рабочей базой)
+        
+        Args:
+            db_path (str): Путь к файлу базы данных
+            immutable (bool): Файл гарантированно не изменяется (копия бэкапа) —
+                              SQLite читает его без блокировок
+        """
+        uri = 'file:' + pathname2url(os.path.abspath(db_path)) + '?mode=ro'
+        if immutable:
+            uri += '&immutable=1'
+        conn = sqlite3.connect(uri, uri=True)
+        conn.row_factory = sqlite3.Row
+        # Хеш содержимого считается в базе, и тексты заметок не сравниваются попарно
+        conn.create_function('note_hash', 1,
+                             lambda content: hashlib.sha1((content or '').encode('utf-8')).hexdigest(),
+                             deterministic=True)
+        return conn
+    
+    def note_rows(self, conn):
+        """Заметки копии (id, title, parent_id, order_index, hash) в порядке возрастания id"""
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if 'note_bodies' in tables:
+            return conn.execute('''
+                SELECT n.id, n.title, n.parent_id, n.order_index, note_hash(b.content) AS hash
+                FROM notes n LEFT JOIN note_bodies b ON b.note_id = n.id
+                WHERE n.id != 1 ORDER BY n.id
+            ''')
+        # Бэкап, сделанный до выделения содержимого в отдельную таблицу
+        return conn.execute('''
+            SELECT id, title, parent_id, order_index, note_hash(content) AS hash
+            FROM notes WHERE id != 1 ORDER BY id
+        ''')
+    
+    def read_note(self, conn, note_id):
+        """Заголовок и содержимое заметки копии (None, если заметки нет)"""
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if 'note_bodies' in tables:
+            return conn.execute('''
+                SELECT n.title, b.content FROM notes n LEFT JOIN note_bodies b ON b.note_id = n.id
+                WHERE n.id = ?
+            ''', (note_id,)).fetchone()
+        return conn.execute('SELECT title, content FROM notes WHERE id = ?', (note_id,)).fetchone()
+    
+    def diff_snapshots(self, old_conn, new_conn):
+        """
+        Сравнение двух копий базы данных
+        
+        Заметки обеих копий читаются потоком в порядке id и сопоставляются
+        слиянием, поэтому память не зависит от количества заметок. Заметка
+        считается перемещённой, если сменился её родитель или её порядок
+        относительно соседей (см. reordered_notes); значения order_index
+        не сравниваются — после перемещения одной заметки соседи перенумеровываются.
+        
+        Args:
+            old_conn, new_conn: Соединения из connect_snapshot
+        
+        Returns:
+            list: Изменения (id, набор изменений, старый заголовок, новый заголовок).
+                  Изменения: 'added', 'removed', 'moved', 'renamed', 'edited'
+        """
+        changes = []
+        reordered = self.reordered_notes(old_conn, new_conn)
+        old_rows = self.note_rows(old_conn)
+        new_rows = self.note_rows(new_conn)
+        old = old_rows.fetchone()
+        new = new_rows.fetchone()
+        while old is not None or new is not None:
+            if new is None or (old is not None and old['id'] < new['id']):
+                changes.append((old['id'], {'removed'}, old['title'], None))
+                old = old_rows.fetchone()
+            elif old is None or new['id'] < old['id']:
+                changes.append((new['id'], {'added'}, None, new['title']))
+                new = new_rows.fetchone()
+            else:
+                kinds = set()
+                if old['parent_id'] != new['parent_id'] or new['id'] in reordered:
+                    kinds.add('moved')
+                if old['title'] != new['title']:
+                    kinds.add('renamed')
+                if old['hash'] != new['hash']:
+                    kinds.add('edited')
+                if kinds:
+                    changes.append((new['id'], kinds, old['title'], new['title']))
+                old = old_rows.fetchone()
+                new = new_rows.fetchone()
+        return changes
+    
+    def reordered_notes(self, old_conn, new_conn):
+        """
+        Заметки, переставленные среди соседей с тем же родителем
+        
+        Дочерние заметки каждого родителя читаются потоком в порядке
+        (parent_id, order_index) обеих копий. Среди заметок, оставшихся у того же
+        родителя, на месте считается наибольшая группа, сохранившая взаимный
+        порядок, переставленными — остальные. Так перетаскивание одной заметки
+        отмечает только её, а не сдвинутых ею соседей.
+        
+        Returns:
+            set: ID переставленных заметок
+        """
+        query = 'SELECT parent_id, id FROM notes WHERE id != 1 ORDER BY parent_id, order_index, id'
+        old_groups = self.sibling_groups(old_conn.execute(query))
+        new_groups = self.sibling_groups(new_conn.execute(query))
+        reordered = set()
+        old = next(old_groups, None)
+        new = next(new_groups, None)
+        while old is not None and new is not None:
+            if old[0] < new[0]:
+                old = next(old_groups, None)
+            elif new[0] < old[0]:
+                new = next(new_groups, None)
+            else:
+                old_positions = {note_id: position for position, note_id in enumerate(old[1])}
+                common = [note_id for note_id in new[1] if note_id in old_positions]
+                kept = stable_subsequence([old_positions[note_id] for note_id in common])
+                reordered.update(note_id for index, note_id in enumerate(common) if index not in kept)
+                old = next(old_groups, None)
+                new = next(new_groups, None)
+        return reordered
+    
+    def sibling_groups(self, rows):
+        """Генератор (parent_id, [id дочерних заметок по порядку]) из строк, упорядоченных по parent_id"""
+        parent_id = None
+        children = []
+        for row in rows:
+            if children and row[0] != parent_id:
+                yield parent_id, children
+                children = []
+            parent_id = row[0]
+            children.append(row[1])
+        if children:
+            yield parent_id, children
+    
+    def cleanup_old_backups(self, db_name, keep_last=10, keep_daily=7, keep_weekly=4,
+                            keep_monthly=12, max_total_size=500 * 1024 * 1024):
+        """
+        Удаление старых бэкапов по схеме «дед-отец-сын»
+        
+        Сохраняются keep_last последних бэкапов, а также самый свежий бэкап
+        за каждый из последних keep_daily дней, keep_weekly недель и keep_monthly
+        месяцев. Если оставшиеся бэкапы занимают больше max_total_size байт,
+        удаляются самые старые из них (последний бэкап не удаляется никогда).
+        Затем из хранилища удаляются фрагменты, не нужные ни одному бэкапу.
+        
+        Args:
+            db_name (str): Имя файла базы данных (без пути)
+            keep_last (int): Количество последних бэкапов
+            keep_daily (int): Количество дней, за которые хранится по одному бэкапу
+            keep_weekly (int): Количество недель, за которые хранится по одному бэкапу
+            keep_monthly (int): Количество месяцев, за которые хранится по одному бэкапу
+            max_total_size (int): Максимальный общий размер бэкапов в байтах
+        """
+        try:
+            # От новых к старым
+            entries = self.get_backup_catalog(db_name)
+            backups = [os.path.join(self.backup_dir, entry['name']) for entry in entries]
+            times = {os.path.join(self.backup_dir, entry['name']): datetime.fromisoformat(entry['created'])
+                     for entry in entries}
+            
+            keep = set(backups[:keep_last])
+            tiers = (
+                (keep_daily, lambda t: t.date()),
+                (keep_weekly, lambda t: t.isocalendar()[:2]),
+                (keep_monthly, lambda t: (t.year, t.month)),
+            )
+            for count, period in tiers:
+                seen = set()
+                for path in backups:
+                    key = period(times[path])
+                    if key not in seen and len(seen) < count:
+                        seen.add(key)
+                        keep.add(path)
+            
+            # Ограничение общего размера: убираем самые старые из оставшихся
+            kept = [path for path in backups if path in keep]
+            while len(kept) > 1 and self.backups_size(kept) > max_total_size:
+                keep.discard(kept.pop())
+            
+            removed = False
+            for file_path in backups:
+                if file_path not in keep:
                     try:
-                        file_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                        if file_time < cutoff_date:
-                            os.remove(file_path)
-                            print(f"Удален старый бэкап: {filename}")
+                        os.remove(file_path)
+                        removed = True
+                        print(f"Удален старый бэкап: {os.path.basename(file_path)}")
                     except Exception as e:
-                        print(f"Ошибка при удалении старого бэкапа {filename}: {e}")
+                        print(f"Ошибка при удалении старого бэкапа {os.path.basename(file_path)}: {e}")
+            # Фрагменты удалённых бэкапов при прерывании удаляются при следующей очистке
+            if removed and not self.cancel_event.is_set():
+                self.collect_garbage()
         except Exception as e:
             print(f"Ошибка при очистке старых бэкапов: {e}")
     
@@ -95,20 +792,8 @@ class BackupManager:
         Returns:
             list: Список путей к файлам бэкапов
         """
-        try:
-            backup_files = []
-            for filename in os.listdir(self.backup_dir):
-                if filename.endswith(".db"):
-                    if db_name is None or filename.startswith(db_name):
-                        file_path = os.path.join(self.backup_dir, filename)
-                        backup_files.append(file_path)
-            
-            # Сортируем по дате создания (от новых к старым)
-            backup_files.sort(key=lambda x: os.path.getmtime(x), reverse=True)
-            return backup_files
-        except Exception as e:
-            print(f"Ошибка при получении списка бэкапов: {e}")
-            return []
+        # Порядок и фильтрация берутся из каталога, без обращения к каждому файлу
+        return [os.path.join(self.backup_dir, entry['name']) for entry in self.get_backup_catalog(db_name)]
     
     def restore_backup(self, backup_path, target_path):
         """
@@ -125,16 +810,289 @@ class BackupManager:
             if not os.path.exists(backup_path):
                 return False
             
-            # Копируем бэкап на место основной базы данных
-            shutil.copy2(backup_path, target_path)
+            # Копируем бэкап на место основной базы данных через SQLite,
+            # чтобы не оставить несогласованных файлов журнала WAL
+            with self.open_backup(backup_path) as snapshot_path:
+                self.copy_database(snapshot_path, target_path)
             return True
             
         except Exception as e:
             print(f"Ошибка при восстановлении бэкапа: {e}")
             return False
 
+def stable_subsequence(positions):
+    """
+    Индексы наибольшей возрастающей подпоследовательности positions
+    
+    Используется для поиска заметок, сохранивших взаимный порядок (O(n log n)).
+    """
+    # Для каждой длины — индекс и значение последнего элемента лучшей подпоследовательности
+    tails = []
+    tail_values = []
+    previous = [None] * len(positions)
+    for index, position in enumerate(positions):
+        length = bisect.bisect_left(tail_values, position)
+        previous[index] = tails[length - 1] if length > 0 else None
+        if length == len(tails):
+            tails.append(index)
+            tail_values.append(position)
+        else:
+            tails[length] = index
+            tail_values[length] = position
+    kept = set()
+    index = tails[-1] if tails else None
+    while index is not None:
+        kept.add(index)
+        index = previous[index]
+    return kept
+
+
+class BackupScheduler:
+    """
+    Периодический бэкап базы данных в фоновом потоке
+    
+    Бэкап создаётся только если база изменилась с момента предыдущего.
+    Изменения определяются по PRAGMA data_version отдельного соединения:
+    значение меняется после каждой транзакции, записанной другими соединениями.
+    При выходе копия не создаётся — база помечается как требующая бэкапа,
+    и он выполняется сразу после следующего запуска.
+    """
+
+    STATE_FILE = 'backup_state.ini'
+
+    def __init__(self, backup_manager, db_path, run_backup, interval=600):
+        """
+        Args:
+            backup_manager (BackupManager): Менеджер бэкапов
+            db_path (str): Путь к отслеживаемой базе данных
+            run_backup (callable): Запуск бэкапа, возвращает Future с путём к бэкапу
+                                   (вызывается из потока планировщика)
+            interval (int): Период проверки изменений в секундах
+        """
+        self.backup_manager = backup_manager
+        self.db_path = db_path
+        self.run_backup = run_backup
+        self.interval = interval
+        self.state_path = os.path.join(backup_manager.backup_dir, self.STATE_FILE)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='NotesDB-backup-scheduler', daemon=True)
+        self.monitor = None  # Соединение для чтения data_version (только в потоке планировщика)
+        self.monitor_path = None
+        self.backed_up_version = None
+
+    def start(self):
+        """Запуск планировщика"""
+        global _backup_scheduler
+        _backup_scheduler = self
+        self.thread.start()
+
+    def set_database(self, db_path):
+        """Смена отслеживаемой базы данных (применяется при следующей проверке)"""
+        self.db_path = db_path
+
+    def stop(self):
+        """
+        Остановка планировщика без ожидания полного копирования
+        
+        Выполняющийся бэкап прерывается, а несохранённые в бэкап изменения
+        отмечаются для бэкапа при следующем запуске.
+        """
+        if self.stop_event.is_set():
+            return
+        self.stop_event.set()
+        self.backup_manager.cancel_backup()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def run(self):
+        try:
+            self.check()
+            while not self.stop_event.wait(self.interval):
+                self.check()
+        except Exception as e:
+            print(f"Ошибка планировщика бэкапов: {e}")
+        finally:
+            # Изменения, не попавшие в бэкап, переносятся на следующий запуск
+            try:
+                if self.monitor is not None:
+                    if self.data_version() != self.backed_up_version:
+                        self.set_pending(self.monitor_path, True)
+                    self.monitor.close()
+            except Exception as e:
+                print(f"Ошибка планировщика бэкапов: {e}")
+
+    def check(self):
+        """Проверка изменений и запуск бэкапа при необходимости"""
+        if self.monitor_path != self.db_path:
+            self.open_monitor(self.db_path)
+        if self.data_version() != self.backed_up_version:
+            self.backup()
+
+    def open_monitor(self, db_path):
+        """Переключение на другую базу данных"""
+        if self.monitor is not None:
+            if self.data_version() != self.backed_up_version:
+                self.set_pending(self.monitor_path, True)
+            self.monitor.close()
+        uri = 'file:' + pathname2url(os.path.abspath(db_path)) + '?mode=ro'
+        self.monitor = sqlite3.connect(uri, uri=True)
+        self.monitor_path = db_path
+        # Текущее состояние считается сохранённым в бэкап, если бэкапы базы есть
+        # и прошлый сеанс не оставил отметку о несохранённых изменениях
+        version = self.data_version()
+        has_backups = bool(self.backup_manager.get_backup_list(os.path.basename(db_path)))
+        self.backed_up_version = version if has_backups and not self.is_pending(db_path) else None
+
+    def data_version(self):
+        return self.monitor.execute('PRAGMA data_version').fetchone()[0]
+
+    def backup(self):
+        """Бэкап текущего состояния базы данных"""
+        version = self.data_version()
+        future = self.run_backup()
+        if future is not None and future.result() and not self.stop_event.is_set():
+            # Изменения, записанные во время копирования, попадут в следующий бэкап
+            self.backed_up_version = version
+            self.set_pending(self.monitor_path, False)
+
+    def state_key(self, db_path):
+        return os.path.abspath(db_path)
+
+    def is_pending(self, db_path):
+        """Есть ли изменения базы, не сохранённые в бэкап в прошлом сеансе"""
+        config = configparser.ConfigParser()
+        config.read(self.state_path, encoding='utf-8')
+        return config.getboolean('pending', self.state_key(db_path), fallback=False)
+
+    def set_pending(self, db_path, pending):
+        """Отметка о несохранённых в бэкап изменениях базы"""
+        try:
+            config = configparser.ConfigParser()
+            config.read(self.state_path, encoding='utf-8')
+            if not config.has_section('pending'):
+                config.add_section('pending')
+            key = self.state_key(db_path)
+            if pending:
+                config['pending'][key] = 'yes'
+            elif config.has_option('pending', key):
+                config.remove_option('pending', key)
+            else:
+                return
+            with open(self.state_path, 'w', encoding='utf-8') as f:
+                config.write(f)
+        except Exception as e:
+            print(f"Ошибка при сохранении состояния бэкапов: {e}")
+
+def search_backup(base_dir, backup_name, text, snippet_size=40):
+    """
+    Поиск текста в содержимом заметок одного бэкапа
+    
+    Выполняется в отдельном процессе (см. HistorySearch). Бэкап из фрагментов
+    собирается в памяти, полная копия открывается как неизменяемая (immutable):
+    SQLite не создаёт блокировок и файлов журнала.
+    
+    Returns:
+        list: Совпадения (имя бэкапа, ID заметки, заголовок, фрагмент текста)
+    """
+    manager = BackupManager(base_dir)
+    backup_path = os.path.join(manager.backup_dir, backup_name)
+    with ExitStack() as stack:
+        if backup_name.endswith(manager.MANIFEST_EXT) and hasattr(sqlite3.Connection, 'deserialize'):
+            conn = manager.connect_in_memory(backup_path)
+        else:
+            snapshot_path = stack.enter_context(manager.open_backup(backup_path))
+            uri = 'file:' + pathname2url(os.path.abspath(snapshot_path)) + '?mode=ro&immutable=1'
+            conn = sqlite3.connect(uri, uri=True)
+        hits = []
+        try:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if 'note_bodies' in tables:
+                query = '''
+                    SELECT n.id, n.title, b.content FROM note_bodies b JOIN notes n ON n.id = b.note_id
+                    WHERE n.id != 1 AND instr(b.content, ?) > 0
+                '''
+            else:
+                # Бэкап, сделанный до выделения содержимого в отдельную таблицу
+                query = 'SELECT id, title, content FROM notes WHERE id != 1 AND instr(content, ?) > 0'
+            for note_id, title, content in conn.execute(query, (text,)):
+                pos = content.find(text)
+                start = max(0, pos - snippet_size)
+                end = min(len(content), pos + len(text) + snippet_size)
+                snippet = ('…' if start > 0 else '') + content[start:end] + ('…' if end < len(content) else '')
+                hits.append((backup_name, note_id, title, ' '.join(snippet.split())))
+        finally:
+            conn.close()
+    return hits
+
+class HistorySearch:
+    """
+    Поиск текста во всех бэкапах
+    
+    Каждый бэкап просматривается отдельной задачей в пуле процессов.
+    Совпадения передаются в on_hits по мере готовности (из служебного потока
+    пула), по завершении вызывается on_finished. После cancel() оставшиеся
+    задачи снимаются, а результаты уже выполняющихся отбрасываются.
+    """
+
+    def __init__(self, backup_manager, text, on_hits, on_finished):
+        """
+        Args:
+            backup_manager (BackupManager): Менеджер бэкапов
+            text (str): Искомый текст (с учётом регистра)
+            on_hits (callable): Вызывается как on_hits(список совпадений) для каждого бэкапа с совпадениями
+            on_finished (callable): Вызывается без аргументов после просмотра всех бэкапов
+        """
+        self.backup_manager = backup_manager
+        self.text = text
+        self.on_hits = on_hits
+        self.on_finished = on_finished
+        self.lock = threading.Lock()
+        self.cancelled = False
+        self.remaining = 0
+        self.executor = None
+
+    def start(self):
+        """Запуск поиска"""
+        names = [os.path.basename(path) for path in self.backup_manager.get_backup_list()]
+        if not names:
+            self.on_finished()
+            return
+        self.remaining = len(names)
+        self.executor = ProcessPoolExecutor()
+        for name in names:
+            future = self.executor.submit(search_backup, self.backup_manager.base_dir, name, self.text)
+            future.add_done_callback(self.task_done)
+
+    def task_done(self, future):
+        with self.lock:
+            if self.cancelled:
+                return
+            self.remaining -= 1
+            finished = self.remaining == 0
+        try:
+            hits = future.result()
+        except Exception as e:
+            print(f"Ошибка при поиске в бэкапе: {e}")
+            hits = []
+        if hits:
+            self.on_hits(hits)
+        if finished:
+            self.executor.shutdown(wait=False)
+            self.on_finished()
+
+    def cancel(self):
+        """Прерывание поиска"""
+        with self.lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
 # Глобальная переменная для хранения экземпляра менеджера
 _backup_manager = None
+# Запущенный планировщик бэкапов
+_backup_scheduler = None
 
 def init_backup_manager(base_dir):
     """
@@ -145,14 +1103,21 @@ def init_backup_manager(base_dir):
     """
     global _backup_manager
     _backup_manager = BackupManager(base_dir)
+    _backup_manager.remove_stale_temp_files()
 
 def create_backup_on_exit():
     """
     Функция для создания бэкапа при завершении программы
     Регистрируется через atexit.register
+    
+    Полная копия при выходе не создаётся: планировщик отмечает изменения,
+    не сохранённые в бэкап, и создаёт его после следующего запуска.
+    Без планировщика бэкап создаётся, только если бэкапов этой базы ещё нет.
     """
     global _backup_manager
-    if _backup_manager:
+    if _backup_scheduler:
+        _backup_scheduler.stop()
+    elif _backup_manager and not _backup_manager.get_backup_list():
         _backup_manager.create_backup()
 
 def register_exit_handler():
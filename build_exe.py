@@ -39,6 +39,12 @@ def build_executable():
         '--add-data=database_manager.py;.',     # Добавляем файл менеджера базы данных
         '--add-data=settings_dialog.py;.', # Добавляем диалог настроек
         '--add-data=toolbar_manager.py;.', # Добавляем менеджер панели инструментов
+        '--add-data=note_tree_model.py;.', # Добавляем модель дерева заметок
+        '--add-data=backup_browser_dialog.py;.', # Добавляем просмотр заметок бэкапа
+        '--add-data=history_search_dialog.py;.', # Добавляем поиск по бэкапам
+        '--add-data=search_panel.py;.', # Добавляем панель результатов поиска
+        '--add-data=note_query.py;.', # Добавляем разбор поисковых запросов
+        '--add-data=backup_diff_dialog.py;.', # Добавляем сравнение бэкапов
         '--hidden-import=PyQt6.QtCore',
         '--hidden-import=PyQt6.QtGui',
         '--hidden-import=PyQt6.QtWidgets',
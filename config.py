@@ -17,7 +17,9 @@ class Config:
             'theme': 'Системная',
             'font_size': 12,
             'auto_save': True,
-            'save_interval': 5
+            'save_interval': 5,
+            'backup_compact': False,  # Сжатые бэкапы через VACUUM INTO
+            'backup_interval': 10  # Период проверки изменений для бэкапа, в минутах
         }
         
     def get_settings(self):
@@ -3,10 +3,384 @@ from datetime import datetime
 import os
 import sys
 import configparser
-from PyQt6.QtWidgets import QMessageBox, QFileDialog, QDialog, QVBoxLayout, QListWidget, QHBoxLayout, QPushButton
+import hashlib
+import functools
+import re
+import json
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from urllib.request import pathname2url
+from PyQt6.QtWidgets import (QApplication, QMessageBox, QFileDialog, QDialog, QVBoxLayout, QListWidget,
+                             QHBoxLayout, QPushButton)
+from PyQt6.QtCore import Qt
 from translations import TRANSLATIONS
+from note_query import parse_query, compile_query, highlight_terms
+
+class DatabaseWriter:
+    """
+    Фоновый поток записи в базу данных
+    
+    Все изменения выполняются по очереди через одно соединение, каждое
+    задание — одной транзакцией. Вызывающий код получает Future и не ждёт
+    записи на диск.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.queue = queue.Queue()
+        # Обработчик сбоев записи (sqlite3.Error, OSError): вызывается из потока записи с текстом ошибки
+        self.on_error = None
+        # Номер последней зафиксированной транзакции (растёт на 1 после каждой записи)
+        self.version = 0
+        # Вызываются в потоке записи после фиксации транзакции (с её номером) или её отката,
+        # до завершения Future задания
+        self.on_commit = None
+        self.on_rollback = None
+        self.thread = threading.Thread(target=self.run, name='NotesDB-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, func, *args):
+        """
+        Постановка записи в очередь
+        
+        Args:
+            func: Функция func(cursor, *args), выполняемая внутри транзакции
+        
+        Returns:
+            Future: Результат func после фиксации транзакции
+        """
+        future = Future()
+        self.queue.put((future, func, args))
+        return future
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        # В режиме WAL достаточно синхронизации при контрольных точках
+        conn.execute('PRAGMA synchronous = NORMAL')
+        while True:
+            task = self.queue.get()
+            if task is None:
+                break
+            future, func, args = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with conn:
+                    result = func(conn.cursor(), *args)
+            except (sqlite3.Error, OSError) as e:
+                if self.on_rollback:
+                    self.on_rollback()
+                # Сбой базы данных или диска: сообщается и тогда, когда результат записи никто не ждёт
+                future.set_exception(e)
+                if self.on_error:
+                    self.on_error(str(e))
+            except Exception as e:
+                if self.on_rollback:
+                    self.on_rollback()
+                # Отказ в операции (например, ValueError при перемещении заметки в своё
+                # поддерево) обрабатывает вызывающий код по Future
+                future.set_exception(e)
+            else:
+                self.version += 1
+                if self.on_commit:
+                    self.on_commit(self.version)
+                future.set_result(result)
+        conn.close()
+
+    def flush(self):
+        """Ожидание выполнения всех поставленных в очередь записей"""
+        self.submit(lambda cursor: None).result()
+
+    def stop(self):
+        """Завершение потока после выполнения оставшихся записей"""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+
+@functools.lru_cache(maxsize=64)
+def compile_search(text, regex=False, ignore_case=False, whole_word=False):
+    """
+    Скомпилированный шаблон поиска (результат кэшируется)
+    
+    Без учёта регистра сравнение выполняет re.IGNORECASE (регистр Unicode,
+    в том числе кириллица). Полное приведение str.casefold не используется:
+    оно меняет длину строки (ß → ss), и позиции вхождений перестали бы
+    соответствовать тексту заметки. Ошибка в регулярном выражении вызывает re.error.
+    """
+    pattern = text if regex else re.escape(text)
+    if whole_word:
+        pattern = r'(?<!\w)(?:' + pattern + r')(?!\w)'
+    return re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+
+
+@functools.lru_cache(maxsize=64)
+def required_literals(text, regex=False):
+    """
+    Подстроки, входящие в любое совпадение с шаблоном (для отбора заметок по индексу)
+    
+    Для регулярного выражения берутся последовательности обычных символов
+    верхнего уровня. Группы, классы символов и символы с необязательным
+    повторением пропускаются; при альтернативе верхнего уровня (|)
+    обязательных подстрок нет.
+    """
+    if not regex:
+        return (text,)
+    try:
+        if re.compile(text).flags & re.VERBOSE:
+            # В подробном режиме пробелы в шаблоне не являются символами текста
+            return ()
+    except re.error:
+        return ()
+
+    literals = []
+    current = ''
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == '\\':
+            escaped = text[i + 1:i + 2]
+            if not escaped or escaped.isalnum():
+                # \d, \w, \b, \x41, \u0410, \N{...}, восьмеричные коды и ссылки на группы
+                # не дают подстроки: экранирование пропускается целиком, подстрока обрывается
+                literals.append(current)
+                current = ''
+                i = skip_regex_escape(text, i)
+                continue
+            i += 2
+            char = escaped
+        elif char == '|':
+            return ()
+        elif char in '([':
+            literals.append(current)
+            current = ''
+            i = skip_regex_group(text, i)
+            continue
+        elif char in '.^$*+?{':
+            # Метасимвол или квантификатор после группы/класса
+            literals.append(current)
+            current = ''
+            i = text.find('}', i) + 1 if char == '{' and '}' in text[i:] else i + 1
+            continue
+        else:
+            i += 1
+        quantifier = text[i:i + 1]
+        if quantifier in ('*', '?', '{'):
+            # Символ может отсутствовать — подстрока обрывается перед ним
+            literals.append(current)
+            current = ''
+        elif quantifier == '+':
+            # Символ обязателен, но за ним может идти его повтор
+            literals.append(current + char)
+            current = ''
+            i += 1
+        else:
+            current += char
+    literals.append(current)
+    return tuple(literal for literal in literals if literal)
+
+
+def skip_regex_escape(text, i):
+    """Позиция после экранирования, начинающегося с обратной косой черты в позиции i"""
+    escaped = text[i + 1:i + 2]
+    i += 2
+    if escaped in ('x', 'u', 'U'):
+        # \xhh, \uXXXX, \UXXXXXXXX
+        length = {'x': 2, 'u': 4, 'U': 8}[escaped]
+        while length and i < len(text) and text[i] in '0123456789abcdefABCDEF':
+            i += 1
+            length -= 1
+    elif escaped == 'N' and text[i:i + 1] == '{':
+        end = text.find('}', i)
+        i = end + 1 if end >= 0 else len(text)
+    elif escaped.isdigit():
+        # Восьмеричный код (до трёх цифр) или номер группы
+        length = 2
+        while length and i < len(text) and text[i].isdigit():
+            i += 1
+            length -= 1
+    return i
+
+
+def skip_regex_group(text, i):
+    """Позиция после группы (...) или класса символов [...], начинающихся в позиции i"""
+    if text[i] == '[':
+        i += 1
+        if text[i:i + 1] == '^':
+            i += 1
+        if text[i:i + 1] == ']':
+            i += 1
+        while i < len(text) and text[i] != ']':
+            i += 2 if text[i] == '\\' else 1
+        return i + 1
+    depth = 0
+    while i < len(text):
+        char = text[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '[':
+            i = skip_regex_group(text, i)
+            continue
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def match_spans(pattern, content):
+    """Позиции непустых совпадений шаблона в тексте: [(start, end), ...]"""
+    return [match.span() for match in pattern.finditer(content or "") if match.end() > match.start()]
+
+
+def replace_matches(pattern, content, replacement, regex=False):
+    """
+    Замена непустых совпадений шаблона
+    
+    Для регулярного выражения replacement раскрывается как шаблон замены
+    (ссылки на группы), иначе подставляется как есть.
+    
+    Returns:
+        tuple: (новый текст, число замен)
+    """
+    count = 0
+
+    def substitute(match):
+        nonlocal count
+        if match.end() == match.start():
+            return match.group()
+        count += 1
+        return match.expand(replacement) if regex else replacement
+
+    return pattern.sub(substitute, content), count
+
+
+def casefold_text(text):
+    """Функция casefold для SQL-запросов (NULL остаётся NULL)"""
+    return text.casefold() if isinstance(text, str) else text
+
+
+class SearchWorker:
+    """
+    Фоновый поток поиска по заметкам
+    
+    Выполняется только последний запрос: новый запрос (или cancel) отменяет
+    предыдущий, прерывая в том числе уже выполняющийся SQL-запрос. Вхождения
+    передаются частями в on_hits(query_id, hits) из потока поиска, по
+    завершении вызывается on_finished(query_id, completed).
+    """
+
+    BATCH_SIZE = 50
+    SNIPPET_SIZE = 40
+
+    def __init__(self, db):
+        self.db = db
+        self.queue = queue.Queue()
+        # Номер последнего запроса: запросы с меньшим номером считаются отменёнными
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name='NotesDB-search', daemon=True)
+        self.thread.start()
+
+    def search(self, text, on_hits, on_finished=None, options=None):
+        """
+        Постановка запроса в очередь с отменой предыдущего. Возвращает ID запроса
+        
+        options — параметры поиска NotesDB.iter_search (regex, ignore_case, whole_word)
+        """
+        with self.lock:
+            self.generation += 1
+            query_id = self.generation
+        self.queue.put((query_id, text, options or {}, on_hits, on_finished))
+        return query_id
+
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+
+    def is_current(self, query_id):
+        return query_id == self.generation
+
+    def stop(self):
+        self.cancel()
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        while True:
+            task = self.queue.get()
+            if task is None:
+                break
+            query_id, text, options, on_hits, on_finished = task
+            if not self.is_current(query_id):
+                continue
+            completed = self.run_query(query_id, text, options, on_hits)
+            if on_finished is not None:
+                on_finished(query_id, completed)
+
+    def run_query(self, query_id, text, options, on_hits):
+        """Выполнение одного запроса. Возвращает True, если поиск не был отменён"""
+        conn = self.db.reader()
+        # SQLite периодически вызывает обработчик и прерывает запрос, если он устарел
+        conn.set_progress_handler(lambda: not self.is_current(query_id), 1000)
+        # Пути заметок: ID родителя -> заголовки от верхнего уровня
+        paths = {}
+        batch = []
+        hits = self.db.iter_search(text, **options)
+        try:
+            for note_id, title, parent_id, content, start, end in hits:
+                if not self.is_current(query_id):
+                    return False
+                batch.append((note_id, title, self.note_path(conn, parent_id, paths),
+                              start, end, self.snippet(content, start, end)))
+                if len(batch) >= self.BATCH_SIZE:
+                    on_hits(query_id, batch)
+                    batch = []
+            if batch:
+                on_hits(query_id, batch)
+            return self.is_current(query_id)
+        except (sqlite3.OperationalError, re.error, ValueError) as e:
+            if self.is_current(query_id):
+                print(f"Ошибка поиска: {str(e)}")
+            return False
+        finally:
+            hits.close()
+            conn.set_progress_handler(None, 0)
+
+    def note_path(self, conn, parent_id, paths):
+        """Путь к заметке — заголовки её предков через « / »"""
+        if parent_id is None or parent_id == 1:
+            return ""
+        path = paths.get(parent_id)
+        if path is None:
+            row = conn.execute('SELECT title, parent_id FROM notes WHERE id = ?', (parent_id,)).fetchone()
+            if row is None:
+                return ""
+            parent_path = self.note_path(conn, row['parent_id'], paths)
+            path = parent_path + " / " + row['title'] if parent_path else row['title']
+            paths[parent_id] = path
+        return path
+
+    def snippet(self, content, start, end):
+        """Фрагмент текста вокруг вхождения в одну строку"""
+        left = max(0, start - self.SNIPPET_SIZE)
+        right = min(len(content), end + self.SNIPPET_SIZE)
+        snippet = ('…' if left > 0 else '') + content[left:right] + ('…' if right < len(content) else '')
+        return ' '.join(snippet.split())
+
 
 class NotesDB:
+    # Текущая версия схемы базы данных (хранится в PRAGMA user_version).
+    # Новые изменения структуры добавляются методом migrate_to_N и увеличением версии.
+    SCHEMA_VERSION = 5
+
     def __init__(self, db_path=None):
         if db_path is None:
             db_path = 'notes.db'
@@ -14,12 +388,74 @@ class NotesDB:
         # Если файл базы данных не существует, создаём его
         if not os.path.exists(self.db_path):
             open(self.db_path, 'a').close()
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
-        self.cursor = self.conn.cursor()
-        self.create_tables()
+        # Соединение для создания и обновления схемы, закрывается после инициализации
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        # WAL: чтение не блокируется записью и не ждёт синхронизации с диском
+        conn.execute('PRAGMA journal_mode = WAL')
+        self.fts_enabled = False
+        try:
+            self.create_tables(conn)
+        finally:
+            conn.close()
+        
+        # Единственное соединение для записи живёт в потоке DatabaseWriter
+        self.pending_writes = {}  # Незавершённые записи по заметкам: note_id -> Future
+        self.pending_lock = threading.Lock()
+        # Последние известные значения полей заметок (прочитанные или записанные).
+        # По ним запись, которая ничего не меняет, пропускается без обращения к базе.
+        self.known_titles = {}  # note_id -> заголовок
+        self.known_hashes = {}  # note_id -> хеш содержимого
+        self.known_orders = {}  # note_id -> order_index
+        self.writer = DatabaseWriter(self.db_path)
+        self.writer.flush()  # Дожидаемся открытия соединения записи (создаёт файлы WAL)
+        # Поток фонового поиска создаётся при первом поиске
+        self.searcher = None
+        # Есть ли замена replace_all, которую можно отменить
+        self.replace_undo_available = False
+        # Кэш результатов поиска: текст -> (номер записи, {note_id: [(start, end), ...]}).
+        # Заметки, изменённые в записях с большим номером, проверяются заново
+        self.search_cache = OrderedDict()
+        self.search_cache_lock = threading.Lock()
+        # Номер сброса кэша: поиск, начатый до сброса, в кэш не попадает
+        self.search_cache_epoch = 0
+        # Изменённые в этом сеансе заметки: note_id -> номер записи (DatabaseWriter.version).
+        # Номера записей не зависят от системных часов, в отличие от updated_at
+        self.note_versions = {}
+        # Заметки, изменённые текущей транзакцией записи (только в потоке записи)
+        self.touched_notes = set()
+        self.writer.on_commit = self.record_changes
+        self.writer.on_rollback = self.touched_notes.clear
+        
+        # Соединения только для чтения: по одному на поток
+        self.readers = threading.local()
+        self.reader_connections = []
+        self.readers_lock = threading.Lock()
+        
+        self.fts_enabled = self.check_search_index()
+
+    def reader(self):
+        """
+        Соединение только для чтения для текущего потока
+        
+        Каждый поток (интерфейс, поиск, бэкап и т.д.) получает собственное
+        соединение, поэтому чтение безопасно выполнять параллельно с записью.
+        """
+        conn = getattr(self.readers, 'conn', None)
+        if conn is None:
+            uri = 'file:' + pathname2url(os.path.abspath(self.db_path)) + '?mode=ro'
+            # Соединение используется только своим потоком; check_same_thread
+            # отключён лишь для того, чтобы close() мог закрыть его из любого потока
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            # Сравнение без учёта регистра для любых алфавитов (lower() в SQLite — только ASCII)
+            conn.create_function('casefold', 1, casefold_text, deterministic=True)
+            self.readers.conn = conn
+            with self.readers_lock:
+                self.reader_connections.append(conn)
+        return conn
 
-    def create_tables(self):
+    def create_tables(self, conn):
         # Получаем путь к директории с exe-файлом
         if getattr(sys, 'frozen', False):
             # Если запущено как exe
@@ -29,126 +465,1117 @@ class NotesDB:
             exe_dir = os.getcwd()
             
         self.db_file = os.path.join(exe_dir, self.db_path)
-        with self.conn:
-            cursor = self.conn.cursor()
-            
-            # Создаем таблицу заметок с поддержкой вложенности
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS notes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    content TEXT,
-                    parent_id INTEGER,
-                    created_at TIMESTAMP,
-                    updated_at TIMESTAMP,
-                    order_index INTEGER DEFAULT 0,
-                    FOREIGN KEY (parent_id) REFERENCES notes (id)
-                )
-            ''')
+        
+        # Приводим схему базы данных к текущей версии
+        self.migrate(conn)
+        
+        with conn:
+            cursor = conn.cursor()
             
             # Создаем корневую заметку, если её нет
             cursor.execute('SELECT id FROM notes WHERE id = 1')
             if not cursor.fetchone():
                 now = datetime.now()
                 cursor.execute(
-                    'INSERT INTO notes (id, title, content, parent_id, created_at, updated_at) VALUES (1, "Все заметки", "", NULL, ?, ?)',
+                    'INSERT INTO notes (id, title, parent_id, created_at, updated_at) VALUES (1, "Все заметки", NULL, ?, ?)',
                     (now, now)
                 )
-                self.conn.commit()
+                cursor.execute('INSERT INTO note_bodies (note_id, content) VALUES (1, "")')
+                conn.commit()
                 
                 # Создаем первую заметку
                 welcome_text = """SkimNote - это простой и удобный менеджер заметок.\n\nОсновные возможности:\n- Создание и редактирование заметок\n- Древовидная структура заметок\n- Поиск по заметкам\n- Поддержка горячих клавиш\n\nЭту заметку можно удалить."""
                 
                 cursor.execute(
-                    'INSERT INTO notes (title, content, parent_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
-                    ("Заметка", welcome_text, 1, now, now)
+                    'INSERT INTO notes (title, parent_id, created_at, updated_at) VALUES (?, ?, ?, ?)',
+                    ("Заметка", 1, now, now)
+                )
+                cursor.execute(
+                    'INSERT INTO note_bodies (note_id, content) VALUES (?, ?)',
+                    (cursor.lastrowid, welcome_text)
                 )
-                self.conn.commit()
+                conn.commit()
+
+    def get_schema_version(self, conn=None):
+        """Получение версии схемы базы данных"""
+        conn = conn or self.reader()
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def migrate(self, conn):
+        """
+        Последовательное обновление схемы базы данных до SCHEMA_VERSION
+        
+        Каждая миграция выполняется в отдельной транзакции вместе с записью
+        новой версии, поэтому прерванное обновление не оставляет базу
+        в промежуточном состоянии.
+        """
+        version = self.get_schema_version(conn)
+        if version > self.SCHEMA_VERSION:
+            print(f"Версия схемы базы данных ({version}) новее поддерживаемой ({self.SCHEMA_VERSION})")
+            return
+        
+        while version < self.SCHEMA_VERSION:
+            version += 1
+            migration = getattr(self, f'migrate_to_{version}')
+            cursor = conn.cursor()
+            try:
+                cursor.execute('BEGIN')
+                migration(cursor)
+                cursor.execute(f'PRAGMA user_version = {version}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            print(f"Схема базы данных обновлена до версии {version}")
+
+    def migrate_to_1(self, cursor):
+        """Базовая схема: структура заметок отдельно от их содержимого"""
+        # Старые базы хранят содержимое прямо в таблице notes — переносим его
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(notes)').fetchall()]
+        if 'content' in columns:
+            cursor.execute('DROP TRIGGER IF EXISTS notes_fts_insert')
+            cursor.execute('DROP TRIGGER IF EXISTS notes_fts_delete')
+            cursor.execute('DROP TRIGGER IF EXISTS notes_fts_update')
+            cursor.execute('DROP TABLE IF EXISTS notes_fts')
+            cursor.execute('ALTER TABLE notes RENAME TO notes_legacy')
+        
+        # Таблица структуры заметок с поддержкой вложенности (без содержимого)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS notes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                parent_id INTEGER,
+                created_at TIMESTAMP,
+                updated_at TIMESTAMP,
+                order_index INTEGER DEFAULT 0,
+                FOREIGN KEY (parent_id) REFERENCES notes (id)
+            )
+        ''')
+        
+        # Содержимое заметок хранится отдельно, чтобы обход дерева не читал большие тексты
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS note_bodies (
+                note_id INTEGER PRIMARY KEY,
+                content TEXT,
+                FOREIGN KEY (note_id) REFERENCES notes (id)
+            )
+        ''')
+        
+        # При удалении заметки удаляется и её содержимое
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS notes_delete_body AFTER DELETE ON notes BEGIN
+                DELETE FROM note_bodies WHERE note_id = old.id;
+            END
+        ''')
+        
+        if 'content' in columns:
+            cursor.execute('''
+                INSERT INTO notes (id, title, parent_id, created_at, updated_at, order_index)
+                SELECT id, title, parent_id, created_at, updated_at, order_index FROM notes_legacy
+            ''')
+            cursor.execute('INSERT OR REPLACE INTO note_bodies (note_id, content) SELECT id, content FROM notes_legacy')
+            # Сохраняем счётчик AUTOINCREMENT, чтобы ID удалённых заметок не использовались повторно
+            cursor.execute('''
+                UPDATE sqlite_sequence SET seq = MAX(seq, (SELECT seq FROM sqlite_sequence WHERE name = 'notes_legacy'))
+                WHERE name = 'notes'
+            ''')
+            cursor.execute('DROP TABLE notes_legacy')
+
+    def migrate_to_2(self, cursor):
+        """Полнотекстовый индекс по содержимому заметок"""
+        self.create_search_index(cursor)
+
+    def migrate_to_3(self, cursor):
+        """Индексы для выборки дерева, порядка заметок и поиска по дате изменения"""
+        # Покрывающий индекс для get_notes, MAX(order_index) в add_note,
+        # подсчёта дочерних заметок и рекурсивного обхода поддерева
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_notes_parent_order ON notes (parent_id, order_index, id, title)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_notes_updated_at ON notes (updated_at)')
+
+    def migrate_to_4(self, cursor):
+        """Дробный порядок заметок: порядок соседей приводится к 1, 2, 3... без совпадений"""
+        # Раньше перемещение записывало в order_index номера строк, а add_note — MAX+1,
+        # из-за чего у соседей встречались одинаковые значения
+        self.rebalance_order(cursor)
+
+    def migrate_to_5(self, cursor):
+        """Индекс для поиска по дате создания (условие created: в запросах)"""
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_notes_created_at ON notes (created_at)')
+
+    def check_search_index(self):
+        """Проверка доступности полнотекстового индекса"""
+        try:
+            self.reader().execute('SELECT rowid FROM notes_fts LIMIT 0')
+            return True
+        except sqlite3.OperationalError:
+            # Индекс не создан (например, SQLite собран без FTS5) — поиск работает без него
+            return False
+
+    def create_search_index(self, cursor):
+        """Создание полнотекстового индекса по содержимому заметок и триггеров синхронизации"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'notes_fts'")
+        index_exists = cursor.fetchone() is not None
+        
+        try:
+            # Триграммный токенизатор позволяет искать произвольные подстроки (не только слова)
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+                    content, content='note_bodies', content_rowid='note_id', tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            # SQLite собран без FTS5 или без триграммного токенизатора — ищем без индекса
+            print(f"Полнотекстовый индекс недоступен: {e}")
+            return
+        
+        # Триггеры поддерживают индекс в актуальном состоянии при любых изменениях заметок
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON note_bodies BEGIN
+                INSERT INTO notes_fts (rowid, content) VALUES (new.note_id, new.content);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON note_bodies BEGIN
+                INSERT INTO notes_fts (notes_fts, rowid, content) VALUES ('delete', old.note_id, old.content);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF content ON note_bodies BEGIN
+                INSERT INTO notes_fts (notes_fts, rowid, content) VALUES ('delete', old.note_id, old.content);
+                INSERT INTO notes_fts (rowid, content) VALUES (new.note_id, new.content);
+            END
+        ''')
+        
+        # Для существующей базы индекс строится один раз по уже сохранённым заметкам
+        if not index_exists:
+            cursor.execute("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')")
+
+    def submit_note_write(self, note_id, func, *args):
+        """Постановка записи заметки в очередь с учётом её как незавершённой"""
+        future = self.writer.submit(func, *args)
+        with self.pending_lock:
+            self.pending_writes[note_id] = future
+        future.add_done_callback(lambda done, note_id=note_id: self.write_finished(note_id, done))
+        return future
+
+    def write_finished(self, note_id, future):
+        with self.pending_lock:
+            if self.pending_writes.get(note_id) is future:
+                del self.pending_writes[note_id]
+            if future.exception() is not None:
+                # Запись не удалась — состояние в базе неизвестно, повторная запись не пропускается
+                self.forget_note(note_id)
+
+    def content_hash(self, content):
+        """Хеш содержимого заметки для сравнения без хранения самого текста"""
+        return hashlib.sha1((content or "").encode('utf-8')).digest()
+
+    def remember_note(self, note_id, title=None, content=None, order_index=None):
+        """Запоминание известных значений полей заметки (None — поле не меняется)"""
+        with self.pending_lock:
+            if title is not None:
+                self.known_titles[note_id] = title
+            if content is not None:
+                self.known_hashes[note_id] = self.content_hash(content)
+            if order_index is not None:
+                self.known_orders[note_id] = order_index
+
+    def forget_note(self, note_id):
+        """Сброс известных значений полей заметки (вызывается под pending_lock)"""
+        self.known_titles.pop(note_id, None)
+        self.known_hashes.pop(note_id, None)
+        self.known_orders.pop(note_id, None)
+
+    def unchanged(self):
+        """Future для пропущенной записи: изменённых строк нет"""
+        future = Future()
+        future.set_result(0)
+        return future
+
+    def wait_for_note(self, note_id):
+        """Ожидание записи заметки, если она ещё в очереди (чтобы не прочитать старые данные)"""
+        with self.pending_lock:
+            future = self.pending_writes.get(note_id)
+        if future is not None:
+            try:
+                future.result()
+            except Exception:
+                pass
 
     def add_note(self, title, content="", parent_id=1):
+        """Создание заметки. Возвращает ID новой заметки (ожидает завершения записи)"""
+        return self.writer.submit(self._add_note, title, content, parent_id).result()
+
+    def _add_note(self, cursor, title, content, parent_id):
         now = datetime.now()
-        with self.conn:
-            # Получаем максимальный порядок для заметок с таким же parent_id
-            self.cursor.execute('SELECT MAX(order_index) FROM notes WHERE parent_id = ?', (parent_id,))
-            max_order = self.cursor.fetchone()[0] or 0
-            
-            self.cursor.execute(
-                'INSERT INTO notes (title, content, parent_id, created_at, updated_at, order_index) VALUES (?, ?, ?, ?, ?, ?)',
-                (title, content, parent_id, now, now, max_order + 1)
-            )
-            return self.cursor.lastrowid
+        # Получаем максимальный порядок для заметок с таким же parent_id
+        cursor.execute('SELECT MAX(order_index) FROM notes WHERE parent_id = ?', (parent_id,))
+        max_order = cursor.fetchone()[0] or 0
+        
+        cursor.execute(
+            'INSERT INTO notes (title, parent_id, created_at, updated_at, order_index) VALUES (?, ?, ?, ?, ?)',
+            (title, parent_id, now, now, max_order + 1)
+        )
+        note_id = cursor.lastrowid
+        cursor.execute('INSERT INTO note_bodies (note_id, content) VALUES (?, ?)', (note_id, content))
+        self.touched_notes.add(note_id)
+        return note_id
 
     def update_note(self, note_id, title, content):
-        now = datetime.now()
-        with self.conn:
-            self.cursor.execute(
-                'UPDATE notes SET title = ?, content = ?, updated_at = ? WHERE id = ?',
-                (title, content, now, note_id)
-            )
-            self.conn.commit()
+        """Обновление заголовка и содержимого заметки. Возвращает Future"""
+        self.remember_note(note_id, title=title, content=content)
+        return self.submit_note_write(note_id, self._write_note, note_id, title, content)
+
+    def _write_note(self, cursor, note_id, title, content):
+        changed = self.write_title(cursor, note_id, title) + self.write_body(cursor, note_id, content)
+        if changed:
+            self.touch_note(cursor, note_id)
+        return changed
+
+    def update_title(self, note_id, title):
+        """
+        Обновление только заголовка заметки. Возвращает Future
+        
+        Если заголовок не изменился, запись пропускается (Future с результатом 0)
+        """
+        with self.pending_lock:
+            if self.known_titles.get(note_id) == title:
+                return self.unchanged()
+        self.remember_note(note_id, title=title)
+        return self.submit_note_write(note_id, self._update_title, note_id, title)
+
+    def _update_title(self, cursor, note_id, title):
+        changed = self.write_title(cursor, note_id, title)
+        if changed:
+            self.touch_note(cursor, note_id)
+        return changed
+
+    def update_content(self, note_id, content):
+        """
+        Обновление только содержимого заметки. Возвращает Future
+        
+        Если хеш содержимого совпадает с последним известным, запись пропускается
+        (Future с результатом 0)
+        """
+        content_hash = self.content_hash(content)
+        with self.pending_lock:
+            if self.known_hashes.get(note_id) == content_hash:
+                return self.unchanged()
+            self.known_hashes[note_id] = content_hash
+        return self.submit_note_write(note_id, self._update_content, note_id, content)
+
+    def _update_content(self, cursor, note_id, content):
+        changed = self.write_body(cursor, note_id, content)
+        if changed:
+            self.touch_note(cursor, note_id)
+        return changed
+
+    def write_title(self, cursor, note_id, title):
+        """Запись заголовка, если он отличается от сохранённого. Возвращает число изменённых строк"""
+        cursor.execute(
+            'UPDATE notes SET title = ? WHERE id = ? AND title IS NOT ?',
+            (title, note_id, title)
+        )
+        return cursor.rowcount
+
+    def write_body(self, cursor, note_id, content):
+        """
+        Запись содержимого заметки (вызывается внутри открытой транзакции)
+        
+        Совпадающее содержимое не перезаписывается. Возвращает число изменённых строк
+        """
+        cursor.execute(
+            'INSERT INTO note_bodies (note_id, content) VALUES (?, ?) '
+            'ON CONFLICT (note_id) DO UPDATE SET content = excluded.content '
+            'WHERE content IS NOT excluded.content',
+            (note_id, content)
+        )
+        return cursor.rowcount
+
+    def touch_note(self, cursor, note_id):
+        """Обновление времени изменения заметки"""
+        cursor.execute('UPDATE notes SET updated_at = ? WHERE id = ?', (datetime.now(), note_id))
+        self.touched_notes.add(note_id)
+
+    def record_changes(self, version):
+        """Номер записи для заметок, изменённых зафиксированной транзакцией (из потока записи)"""
+        if not self.touched_notes:
+            return
+        with self.search_cache_lock:
+            for note_id in self.touched_notes:
+                self.note_versions[note_id] = version
+        self.touched_notes.clear()
 
     def update_note_order(self, note_id, new_order):
-        """Обновляет порядок заметки"""
-        with self.conn:
-            self.cursor.execute(
-                'UPDATE notes SET order_index = ? WHERE id = ?',
-                (new_order, note_id)
+        """
+        Обновляет порядок заметки. Возвращает Future
+        
+        Если порядок не изменился, запись пропускается (Future с результатом 0)
+        """
+        with self.pending_lock:
+            if self.known_orders.get(note_id) == new_order:
+                return self.unchanged()
+        self.remember_note(note_id, order_index=new_order)
+        return self.submit_note_write(note_id, self._update_note_order, note_id, new_order)
+
+    def _update_note_order(self, cursor, note_id, new_order):
+        cursor.execute(
+            'UPDATE notes SET order_index = ? WHERE id = ? AND order_index IS NOT ?',
+            (new_order, note_id, new_order)
+        )
+        return cursor.rowcount
+
+    # Порядок заметок дробный: заметка, перемещаемая между соседями, получает
+    # среднее их значений, поэтому перемещение записывает ровно одну строку.
+    # Когда промежуток между соседями становится слишком мал, их порядок
+    # перенумеровывается (в фоне, отдельной задачей писателя).
+    ORDER_MIN_GAP = 1e-9
+    ORDER_REBALANCE_GAP = 1e-6
+
+    def move_note_to(self, note_id, prev_id=None, next_id=None):
+        """
+        Перемещение заметки между двумя соседями. Возвращает Future
+        
+        Args:
+            note_id (int): ID перемещаемой заметки
+            prev_id (int): ID заметки, после которой она встанет (None — в начало списка)
+            next_id (int): ID заметки, перед которой она встанет (None — в конец списка)
+        """
+        with self.pending_lock:
+            self.known_orders.pop(note_id, None)
+        future = self.submit_note_write(note_id, self._move_note_to, note_id, prev_id, next_id)
+        return self.invalidates_search(future)
+
+    def _move_note_to(self, cursor, note_id, prev_id, next_id):
+        cursor.execute('SELECT parent_id FROM notes WHERE id = ?', (note_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return 0
+        return self.place_note(cursor, note_id, row[0], prev_id, next_id)
+
+    def place_note(self, cursor, note_id, parent_id, prev_id, next_id):
+        """Запись родителя и порядка заметки между соседями prev_id и next_id (одна строка)"""
+        order_index, gap = self.order_between(cursor, prev_id, next_id)
+        if order_index is None:
+            # Между соседями не осталось места — перенумеровываем их сразу
+            self._rebalance_order(cursor, parent_id)
+            order_index, gap = self.order_between(cursor, prev_id, next_id)
+        elif gap < self.ORDER_REBALANCE_GAP:
+            # Место ещё есть, но заканчивается — перенумерация выполнится следующей задачей
+            self.invalidates_search(self.writer.submit(self._rebalance_order, parent_id))
+        cursor.execute('UPDATE notes SET parent_id = ?, order_index = ? WHERE id = ?',
+                       (parent_id, order_index, note_id))
+        return cursor.rowcount
+
+    def move_subtree(self, note_id, new_parent_id, position=None):
+        """
+        Перенос заметки вместе с вложенными к другому родителю. Возвращает Future
+        
+        Меняется только строка самой заметки (родитель и порядок), вложенные
+        заметки и даты создания и изменения остаются прежними.
+        
+        Args:
+            note_id (int): ID переносимой заметки
+            new_parent_id (int): ID нового родителя
+            position (int): Позиция среди дочерних заметок нового родителя (None — в конец)
+        
+        Future завершается с ValueError, если новый родитель находится внутри переносимой ветки.
+        """
+        with self.pending_lock:
+            self.known_orders.pop(note_id, None)
+        future = self.submit_note_write(note_id, self._move_subtree, note_id, new_parent_id, position)
+        return self.invalidates_search(future)
+
+    def _move_subtree(self, cursor, note_id, new_parent_id, position):
+        if note_id == 1:
+            raise ValueError("Корневую заметку нельзя переместить")
+        # Новый родитель не может быть самой заметкой или её потомком
+        cursor.execute('''
+            WITH RECURSIVE ancestors(id) AS (
+                SELECT ?
+                UNION
+                SELECT n.parent_id FROM notes n JOIN ancestors a ON n.id = a.id
+                WHERE n.parent_id IS NOT NULL
             )
-            self.conn.commit()
+            SELECT 1 FROM ancestors WHERE id = ?
+        ''', (new_parent_id, note_id))
+        if cursor.fetchone() is not None:
+            raise ValueError("Нельзя переместить заметку внутрь неё самой")
+        cursor.execute('SELECT 1 FROM notes WHERE id = ?', (new_parent_id,))
+        if cursor.fetchone() is None:
+            raise ValueError(f"Заметка {new_parent_id} не найдена")
 
-    def get_notes(self, parent_id=None):
-        with self.conn:
-            if parent_id is None:
-                self.cursor.execute('SELECT id, title, content, parent_id, created_at, updated_at, order_index FROM notes ORDER BY order_index, id')
-            else:
-                self.cursor.execute('SELECT id, title, content, parent_id, created_at, updated_at, order_index FROM notes WHERE parent_id = ? ORDER BY order_index, id', (parent_id,))
-            return self.cursor.fetchall()
+        # Соседи на новом месте (сама заметка в их число не входит)
+        prev_id = next_id = None
+        rows = []
+        if position is not None:
+            cursor.execute(
+                'SELECT id FROM notes WHERE parent_id = ? AND id != ? ORDER BY order_index, id LIMIT 2 OFFSET ?',
+                (new_parent_id, note_id, max(position - 1, 0)))
+            rows = [row[0] for row in cursor.fetchall()]
+        if position is not None and position <= 0:
+            next_id = rows[0] if rows else None
+        elif rows:
+            prev_id = rows[0]
+            next_id = rows[1] if len(rows) > 1 else None
+        else:
+            # В конец списка (в том числе при позиции за его концом)
+            cursor.execute(
+                'SELECT id FROM notes WHERE parent_id = ? AND id != ? ORDER BY order_index DESC, id DESC LIMIT 1',
+                (new_parent_id, note_id))
+            row = cursor.fetchone()
+            prev_id = row[0] if row else None
+        return self.place_note(cursor, note_id, new_parent_id, prev_id, next_id)
+
+    def order_between(self, cursor, prev_id, next_id):
+        """
+        Порядковое значение между двумя соседями
+        
+        Returns:
+            tuple: (значение, оставшийся промежуток) или (None, 0), если места между соседями нет
+        """
+        def order_of(note_id):
+            if note_id is None:
+                return None
+            cursor.execute('SELECT order_index FROM notes WHERE id = ?', (note_id,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+        prev_order = order_of(prev_id)
+        next_order = order_of(next_id)
+        if prev_order is None and next_order is None:
+            return 1, 1
+        if prev_order is None:
+            return next_order - 1, 1
+        if next_order is None:
+            return prev_order + 1, 1
+        gap = (next_order - prev_order) / 2
+        if gap < self.ORDER_MIN_GAP:
+            return None, 0
+        return prev_order + gap, gap
+
+    def rebalance_order(self, cursor, parent_id=None):
+        """
+        Перенумерация порядка соседей целыми числами 1, 2, 3... с сохранением их порядка
+        
+        Args:
+            parent_id (int): ID родителя, чьи дочерние заметки перенумеровываются (None — все)
+        """
+        cursor.execute('''
+            WITH ranked AS (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY parent_id ORDER BY order_index, id) AS position
+                FROM notes
+                WHERE ? IS NULL OR parent_id = ?
+            )
+            UPDATE notes SET order_index = ranked.position
+            FROM ranked
+            WHERE notes.id = ranked.id AND notes.order_index IS NOT ranked.position
+        ''', (parent_id, parent_id))
+        return cursor.rowcount
+
+    def _rebalance_order(self, cursor, parent_id):
+        changed = self.rebalance_order(cursor, parent_id)
+        # Известный порядок перенумерованных соседей устарел
+        with self.pending_lock:
+            self.known_orders.clear()
+        return changed
 
-    def get_note(self, note_id):
-        """Получение заметки по ID"""
-        with self.conn:
-            self.cursor.execute("SELECT id, title, content, parent_id, order_index FROM notes WHERE id = ?", (note_id,))
-            return self.cursor.fetchone()
+    def get_notes(self, parent_id=None, schema='main'):
+        """
+        Получение заметок без содержимого (для построения дерева)
+        
+        Args:
+            parent_id (int, optional): ID родителя. Если не указан, возвращаются все заметки
+            schema (str): Схема, из которой читаются заметки ('main' или подключённый бэкап)
+        
+        Returns:
+            list: Строки с полями id, title, parent_id, order_index
+                  и child_count (количество дочерних заметок)
+        """
+        query = f'''
+            SELECT n.id, n.title, n.parent_id, n.order_index,
+                   (SELECT COUNT(*) FROM {schema}.notes c WHERE c.parent_id = n.id) AS child_count
+            FROM {schema}.notes n
+        '''
+        conn = self.reader()
+        if parent_id is None:
+            return conn.execute(query + ' ORDER BY n.order_index, n.id').fetchall()
+        return conn.execute(query + ' WHERE n.parent_id = ? ORDER BY n.order_index, n.id', (parent_id,)).fetchall()
+
+    def get_note_path(self, note_id, schema='main'):
+        """
+        Получение цепочки ID от заметки верхнего уровня до указанной заметки
+        
+        Args:
+            note_id (int): ID заметки
+            schema (str): Схема, из которой читаются заметки
+        
+        Returns:
+            list: ID заметок от верхнего уровня (без корневой) до note_id включительно
+        """
+        rows = self.reader().execute(f'''
+            WITH RECURSIVE ancestors(id, parent_id, depth) AS (
+                SELECT id, parent_id, 0 FROM {schema}.notes WHERE id = ?
+                UNION ALL
+                SELECT n.id, n.parent_id, a.depth + 1 FROM {schema}.notes n JOIN ancestors a ON n.id = a.parent_id
+            )
+            SELECT id FROM ancestors WHERE id != 1 ORDER BY depth DESC
+        ''', (note_id,))
+        return [row[0] for row in rows]
+
+    def get_note(self, note_id, with_content=True, schema='main'):
+        """
+        Получение заметки по ID
+        
+        Args:
+            note_id (int): ID заметки
+            with_content (bool): Загружать ли содержимое. Если False, поле content равно None
+                                 и таблица содержимого не читается
+            schema (str): Схема, из которой читается заметка
+        """
+        conn = self.reader()
+        if schema != 'main':
+            return conn.execute(f'''
+                SELECT n.id, n.title, b.content, n.parent_id, n.order_index
+                FROM {schema}.notes n LEFT JOIN {schema}.note_bodies b ON b.note_id = n.id
+                WHERE n.id = ?
+            ''', (note_id,)).fetchone()
+        
+        self.wait_for_note(note_id)
+        if with_content:
+            note = conn.execute('''
+                SELECT n.id, n.title, b.content, n.parent_id, n.order_index
+                FROM notes n LEFT JOIN note_bodies b ON b.note_id = n.id
+                WHERE n.id = ?
+            ''', (note_id,)).fetchone()
+        else:
+            note = conn.execute(
+                "SELECT id, title, NULL AS content, parent_id, order_index FROM notes WHERE id = ?",
+                (note_id,)
+            ).fetchone()
+        if note:
+            self.remember_note(note_id, title=note['title'],
+                               content=note['content'] if with_content else None,
+                               order_index=note['order_index'])
+        return note
 
     def delete_note(self, note_id):
-        with self.conn:
-            # Рекурсивно удаляем все вложенные заметки
-            self.cursor.execute('''
-                WITH RECURSIVE children AS (
-                    SELECT id FROM notes WHERE id = ?
-                    UNION ALL
-                    SELECT n.id FROM notes n JOIN children c ON n.parent_id = c.id
-                )
-                DELETE FROM notes WHERE id IN (SELECT id FROM children)
-            ''', (note_id,))
-            self.conn.commit()
+        """Удаление заметки вместе со всеми вложенными. Возвращает Future"""
+        future = self.writer.submit(self._delete_note, note_id)
+        return self.invalidates_search(future)
+
+    def _delete_note(self, cursor, note_id):
+        # Рекурсивно удаляем все вложенные заметки
+        cursor.execute('''
+            WITH RECURSIVE children AS (
+                SELECT id FROM notes WHERE id = ?
+                UNION ALL
+                SELECT n.id FROM notes n JOIN children c ON n.parent_id = c.id
+            )
+            DELETE FROM notes WHERE id IN (SELECT id FROM children)
+        ''', (note_id,))
 
     def get_all_notes(self):
         """Получение всех заметок"""
-        with self.conn:
-            self.cursor.execute("SELECT id, title, content, parent_id, order_index FROM notes ORDER BY order_index, id")
-            return self.cursor.fetchall()
+        return self.reader().execute('''
+            SELECT n.id, n.title, b.content, n.parent_id, n.order_index
+            FROM notes n LEFT JOIN note_bodies b ON b.note_id = n.id
+            ORDER BY n.order_index, n.id
+        ''').fetchall()
+
+    def search_content(self, text, regex=False, ignore_case=False, whole_word=False, query=False):
+        """
+        Поиск текста в содержимом заметок
+        
+        Кандидаты отбираются полнотекстовым индексом, поэтому содержимое
+        заметок без совпадений не загружается. Повторный поиск того же текста
+        без изменений в заметках берётся из кэша без обращения к содержимому.
+        
+        Args:
+            text (str): Искомый текст или регулярное выражение
+            regex (bool): text — регулярное выражение
+            ignore_case (bool): Без учёта регистра
+            whole_word (bool): Только целые слова
+            query (bool): text — запрос с условиями (см. note_query.parse_query)
+        
+        Returns:
+            list: Список вхождений (note_id, start, end)
+        """
+        if not text:
+            return []
+        if query:
+            return [(note_id, start, end) for note_id, title, parent_id, content, start, end
+                    in self.iter_query(text)]
+        key = (text, regex, ignore_case, whole_word)
+        with self.search_cache_lock:
+            cached = self.search_cache.get(key)
+            epoch = self.search_cache_epoch
+        if cached is None:
+            return [(note_id, start, end) for note_id, title, parent_id, content, start, end
+                    in self.iter_search(text, regex, ignore_case, whole_word)]
+        
+        self.writer.flush()
+        started = self.writer.version
+        changed = self.changed_since(cached[0])
+        hits = cached[1]
+        if changed:
+            # Заново проверяются только изменённые заметки, остальные берутся из кэша
+            pattern = compile_search(*key)
+            hits = {note_id: spans for note_id, spans in hits.items() if note_id not in changed}
+            conn = self.reader()
+            rows = conn.execute('''
+                SELECT b.note_id, b.content FROM note_bodies b
+                WHERE b.note_id IN (SELECT value FROM json_each(?)) AND b.note_id != 1
+            ''', (json.dumps(sorted(changed)),))
+            for note_id, content in rows:
+                spans = match_spans(pattern, content)
+                if spans:
+                    hits[note_id] = spans
+            # Восстанавливаем порядок заметок
+            order = conn.execute('''
+                SELECT id FROM notes WHERE id IN (SELECT value FROM json_each(?)) ORDER BY order_index, id
+            ''', (json.dumps(list(hits)),))
+            hits = {row[0]: hits[row[0]] for row in order}
+            self.store_search(key, started, hits, epoch)
+        return [(note_id, start, end) for note_id, spans in hits.items() for start, end in spans]
+
+    def iter_search(self, text, regex=False, ignore_case=False, whole_word=False, query=False):
+        """
+        Генератор вхождений текста в содержимое заметок (в порядке заметок)
+        
+        Вхождения выдаются по мере чтения заметок, поэтому поиск можно
+        прервать, не дожидаясь просмотра всей базы. Если раньше искался текст,
+        входящий в text (например, его начало при наборе), проверяются только
+        найденные тогда заметки и заметки, изменённые после того поиска.
+        Параметры — как у search_content; ошибка в регулярном выражении
+        вызывает re.error.
+        
+        Yields:
+            tuple: (note_id, title, parent_id, content, start, end)
+        """
+        if not text:
+            return
+        if query:
+            yield from self.iter_query(text)
+            return
+        key = (text, regex, ignore_case, whole_word)
+        pattern = compile_search(*key)
+        
+        epoch = self.search_cache_epoch
+        # Результаты должны учитывать уже сохранённые, но ещё не записанные изменения.
+        # Заметки, изменённые в записях после этого номера, проверяются при следующем поиске
+        self.writer.flush()
+        started = self.writer.version
+        cursor = self.reader().cursor()
+        base = self.cached_search(key)
+        if base is None:
+            # Флаг регистра берётся из шаблона: выражение может включать его само ((?i)...)
+            cursor.execute(*self.candidates_query(required_literals(text, regex),
+                                                  bool(pattern.flags & re.IGNORECASE)))
+        else:
+            candidates = set(base[1]) | self.changed_since(base[0])
+            cursor.execute('''
+                SELECT n.id, n.title, n.parent_id, b.content FROM notes n
+                JOIN note_bodies b ON b.note_id = n.id
+                WHERE n.id IN (SELECT value FROM json_each(?)) AND n.id != 1
+                ORDER BY n.order_index, n.id
+            ''', (json.dumps(sorted(candidates)),))
+        
+        hits = {}
+        for note_id, title, parent_id, content in cursor:
+            content = content or ""
+            for start, end in match_spans(pattern, content):
+                hits.setdefault(note_id, []).append((start, end))
+                yield note_id, title, parent_id, content, start, end
+        # Кэшируется только полностью выполненный поиск
+        self.store_search(key, started, hits, epoch)
+
+    def iter_query(self, text):
+        """
+        Генератор результатов запроса с условиями (в порядке заметок)
+        
+        Например: title:бюджет in:"Проекты/2026" modified:>2026-01-01 -черновик.
+        Запрос выполняется одним SQL-запросом (см. note_query.compile_query);
+        в найденных заметках выделяются вхождения искомых слов, а заметка,
+        найденная только по заголовку или дате, выдаётся один раз с
+        пустым вхождением в начале. Ошибка в запросе вызывает ValueError.
+        
+        Yields:
+            tuple: (note_id, title, parent_id, content, start, end)
+        """
+        terms = parse_query(text)
+        if not terms:
+            return
+        patterns = [compile_search(term, ignore_case=True) for term in highlight_terms(terms)]
+        self.writer.flush()
+        cursor = self.reader().cursor()
+        cursor.execute(*compile_query(terms, self.fts_enabled))
+        for note_id, title, parent_id, content in cursor:
+            content = content or ""
+            spans = sorted({span for pattern in patterns for span in match_spans(pattern, content)})
+            for start, end in spans or [(0, 0)]:
+                yield note_id, title, parent_id, content, start, end
+
+    SEARCH_CACHE_SIZE = 32
+
+    def cached_search(self, key):
+        """
+        Кэшированный результат, из которого можно получить результат поиска key
+        
+        Подходит тот же запрос, а для простого поиска подстроки — и самый длинный
+        ранее искавшийся текст, входящий в искомый (с теми же параметрами).
+        """
+        text, regex, ignore_case, whole_word = key
+        with self.search_cache_lock:
+            best = key if key in self.search_cache else None
+            if best is None and not regex and not whole_word:
+                for cached_key in self.search_cache:
+                    cached_text, cached_regex, cached_ignore_case, cached_whole_word = cached_key
+                    if (not cached_regex and not cached_whole_word and cached_ignore_case == ignore_case
+                            and cached_text in text and (best is None or len(cached_text) > len(best[0]))):
+                        best = cached_key
+            if best is None:
+                return None
+            self.search_cache.move_to_end(best)
+            return self.search_cache[best]
+
+    def store_search(self, key, started, hits, epoch):
+        with self.search_cache_lock:
+            if epoch != self.search_cache_epoch:
+                return
+            self.search_cache[key] = (started, hits)
+            self.search_cache.move_to_end(key)
+            while len(self.search_cache) > self.SEARCH_CACHE_SIZE:
+                self.search_cache.popitem(last=False)
+
+    def clear_search_cache(self):
+        """Сброс кэша поиска"""
+        with self.search_cache_lock:
+            self.search_cache.clear()
+            self.search_cache_epoch += 1
+
+    def invalidates_search(self, future):
+        """
+        Сброс кэша поиска после фиксации записи (возвращает тот же Future)
+        
+        Нужен для изменений, которые не отмечаются в note_versions: удаление и
+        перемещение заметок, перенумерация порядка, копирование из бэкапа,
+        отмена замены, восстановление базы.
+        """
+        future.add_done_callback(lambda done: self.clear_search_cache())
+        return future
+
+    def changed_since(self, version):
+        """ID заметок, изменённых в записях с номером больше version"""
+        with self.search_cache_lock:
+            return {note_id for note_id, changed in self.note_versions.items() if changed > version}
+
+    def candidates_query(self, literals, ignore_case=False):
+        """
+        Запрос заметок, содержимое которых может содержать все подстроки literals
+        
+        Args:
+            literals (tuple): Подстроки, входящие в любое совпадение (см. required_literals)
+            ignore_case (bool): Подстроки ищутся без учёта регистра
+        
+        Returns:
+            tuple: (SQL, параметры) — выбираются id, title, parent_id и content
+        """
+        # Триграммный индекс работает с подстроками от трёх символов
+        # и не учитывает регистр — точное совпадение проверяется после выборки
+        indexed = [literal for literal in literals if len(literal) >= 3]
+        if self.fts_enabled and indexed:
+            query = ' AND '.join('"' + literal.replace('"', '""') + '"' for literal in indexed)
+            return '''
+                SELECT n.id, n.title, n.parent_id, b.content FROM notes_fts
+                JOIN note_bodies b ON b.note_id = notes_fts.rowid
+                JOIN notes n ON n.id = b.note_id
+                WHERE notes_fts MATCH ? AND n.id != 1
+                ORDER BY n.order_index, n.id
+            ''', (query,)
+        # Без индекса подстрока проверяется в SQLite через instr (с учётом регистра),
+        # а без учёта регистра или без подстрок просматриваются все заметки
+        literal = max(literals, key=len) if literals and not ignore_case else None
+        return '''
+            SELECT n.id, n.title, n.parent_id, b.content FROM note_bodies b
+            JOIN notes n ON n.id = b.note_id
+            WHERE n.id != 1 AND (? IS NULL OR instr(b.content, ?) > 0)
+            ORDER BY n.order_index, n.id
+        ''', (literal, literal)
+
+    def replace_all(self, text, replacement, regex=False, ignore_case=False, whole_word=False):
+        """
+        Замена всех вхождений текста во всех заметках одной транзакцией
+        
+        Каждая затронутая заметка перезаписывается один раз. Прежнее содержимое
+        сохраняется, и всю замену можно отменить методом undo_replace_all.
+        Параметры поиска — как у search_content. Для регулярного выражения
+        replacement может ссылаться на группы (\\1, \\g<name>), иначе
+        подставляется как есть.
+        
+        Returns:
+            Future: Словарь {note_id: число замен} (пустой, если вхождений нет)
+        """
+        return self.writer.submit(self._replace_all, text, replacement, regex, ignore_case, whole_word)
+
+    def _replace_all(self, cursor, text, replacement, regex, ignore_case, whole_word):
+        if not text:
+            return {}
+        pattern = compile_search(text, regex, ignore_case, whole_word)
+        cursor.execute(*self.candidates_query(required_literals(text, regex),
+                                              bool(pattern.flags & re.IGNORECASE)))
+        changes = []
+        counts = {}
+        for note_id, title, parent_id, content in cursor.fetchall():
+            new_content, count = replace_matches(pattern, content or "", replacement, regex)
+            if count:
+                counts[note_id] = count
+                changes.append((note_id, content, new_content))
+        if not changes:
+            return counts
+
+        # Данные для отмены хранятся во временной таблице соединения записи
+        # (только для последней замены)
+        cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS replace_undo (
+                note_id INTEGER PRIMARY KEY,
+                old_content TEXT,
+                new_content TEXT,
+                updated_at TIMESTAMP
+            )
+        ''')
+        cursor.execute('DELETE FROM temp.replace_undo')
+        cursor.executemany(
+            'INSERT INTO temp.replace_undo (note_id, old_content, new_content) VALUES (?, ?, ?)', changes)
+        cursor.execute('''
+            UPDATE temp.replace_undo SET updated_at = (SELECT updated_at FROM notes WHERE id = replace_undo.note_id)
+        ''')
+        cursor.execute('''
+            UPDATE note_bodies SET content = u.new_content
+            FROM temp.replace_undo u WHERE note_bodies.note_id = u.note_id
+        ''')
+        cursor.execute('''
+            UPDATE notes SET updated_at = ? WHERE id IN (SELECT note_id FROM temp.replace_undo)
+        ''', (datetime.now(),))
+        with self.pending_lock:
+            for note_id, old_content, new_content in changes:
+                self.known_hashes[note_id] = self.content_hash(new_content)
+        self.touched_notes.update(note_id for note_id, old_content, new_content in changes)
+        self.replace_undo_available = True
+        return counts
+
+    def undo_replace_all(self):
+        """
+        Отмена последней замены replace_all одной транзакцией
+        
+        Заметки, изменённые после замены, не восстанавливаются, чтобы не
+        потерять более поздние правки.
+        
+        Returns:
+            Future: Список ID восстановленных заметок
+        """
+        future = self.writer.submit(self._undo_replace_all)
+        return self.invalidates_search(future)
+
+    def _undo_replace_all(self, cursor):
+        if not self.replace_undo_available:
+            return []
+        cursor.execute('''
+            SELECT u.note_id FROM temp.replace_undo u
+            JOIN note_bodies b ON b.note_id = u.note_id
+            WHERE b.content IS u.new_content
+        ''')
+        restored = [row[0] for row in cursor.fetchall()]
+        cursor.execute('''
+            UPDATE notes SET updated_at = u.updated_at
+            FROM temp.replace_undo u JOIN note_bodies b ON b.note_id = u.note_id
+            WHERE notes.id = u.note_id AND b.content IS u.new_content
+        ''')
+        cursor.execute('''
+            UPDATE note_bodies SET content = u.old_content
+            FROM temp.replace_undo u
+            WHERE note_bodies.note_id = u.note_id AND note_bodies.content IS u.new_content
+        ''')
+        cursor.execute('DELETE FROM temp.replace_undo')
+        with self.pending_lock:
+            for note_id in restored:
+                self.known_hashes.pop(note_id, None)
+        self.replace_undo_available = False
+        return restored
+
+    def search_async(self, text, on_hits, on_finished=None, **options):
+        """
+        Поиск в фоновом потоке (см. SearchWorker). Предыдущий поиск отменяется
+        
+        options — параметры поиска, как у search_content (regex, ignore_case, whole_word, query)
+        
+        Returns:
+            int: ID запроса, передаваемый в on_hits и on_finished
+        """
+        if self.searcher is None:
+            self.searcher = SearchWorker(self)
+        return self.searcher.search(text, on_hits, on_finished, options)
+
+    def cancel_search(self):
+        """Отмена выполняющегося фонового поиска"""
+        if self.searcher is not None:
+            self.searcher.cancel()
 
     def save_note(self, note_id, title, content):
-        """Сохранение заметки"""
+        """Сохранение заметки. Возвращает Future, запись выполняется в фоновом потоке"""
         print(f"DEBUG: NotesDB.save_note called")
         print(f"DEBUG: note_id = {note_id}")
         print(f"DEBUG: title = {title}")
         print(f"DEBUG: content length = {len(content) if content else 0}")
         
-        now = datetime.now()
-        with self.conn:
-            self.cursor.execute(
-                'UPDATE notes SET title = ?, content = ?, updated_at = ? WHERE id = ?',
-                (title, content, now, note_id)
-            )
-            print(f"DEBUG: SQL executed, rows affected = {self.cursor.rowcount}")
-            self.conn.commit()
-            print(f"DEBUG: Transaction committed")
+        self.remember_note(note_id, title=title, content=content)
+        return self.submit_note_write(note_id, self._write_note, note_id, title, content)
+
+    def restore_from(self, backup_path, progress=None, pages=256):
+        """
+        Замена содержимого базы данных копией из бэкапа без закрытия базы
+        
+        Копирование выполняется потоком записи через backup API SQLite,
+        порциями по pages страниц. Записи, поставленные в очередь раньше,
+        успевают выполниться до восстановления.
+        
+        Args:
+            backup_path (str): Путь к файлу бэкапа
+            progress (callable, optional): Вызывается из потока записи как progress(скопировано, всего)
+            pages (int): Количество страниц, копируемых за один шаг
+        
+        Returns:
+            Future: Завершается после восстановления и обновления схемы
+        """
+        future = self.writer.submit(self._restore_from, backup_path, progress, pages)
+        return self.invalidates_search(future)
+
+    def _restore_from(self, cursor, backup_path, progress, pages):
+        conn = cursor.connection
+        uri = 'file:' + pathname2url(os.path.abspath(backup_path)) + '?mode=ro'
+        source = sqlite3.connect(uri, uri=True)
+        try:
+            def on_step(status, remaining, total):
+                if progress:
+                    progress(total - remaining, total)
+            
+            source.backup(conn, pages=pages, progress=on_step)
+        finally:
+            source.close()
+        
+        conn.execute('PRAGMA journal_mode = WAL')
+        # Бэкап мог быть сделан до обновления схемы
+        self.create_tables(conn)
+        # Известные значения полей и отмена замены относятся к прежнему содержимому базы
+        self.replace_undo_available = False
+        with self.pending_lock:
+            self.known_titles.clear()
+            self.known_hashes.clear()
+            self.known_orders.clear()
+        try:
+            conn.execute('SELECT rowid FROM notes_fts LIMIT 0')
+            self.fts_enabled = True
+        except sqlite3.OperationalError:
+            self.fts_enabled = False
+
+    def attach_backup(self, snapshot_path, schema='backup'):
+        """
+        Подключение копии базы данных из бэкапа только для чтения
+        
+        Схема копии предварительно обновляется до текущей версии, поэтому
+        snapshot_path должен быть временной копией (BackupManager.open_backup
+        с private=True). Копия подключается к соединению чтения текущего потока
+        и читается методами get_notes, get_note и get_note_path с параметром schema.
+        """
+        conn = sqlite3.connect(snapshot_path)
+        try:
+            self.migrate(conn)
+        finally:
+            conn.close()
+        uri = 'file:' + pathname2url(os.path.abspath(snapshot_path)) + '?mode=ro'
+        self.reader().execute('ATTACH DATABASE ? AS ' + schema, (uri,))
+
+    def detach_backup(self, schema='backup'):
+        """Отключение копии, подключённой attach_backup"""
+        self.reader().execute('DETACH DATABASE ' + schema)
+
+    def copy_from_backup(self, snapshot_path, note_id, parent_id=1, with_children=True):
+        """
+        Копирование заметки из бэкапа в текущую базу данных
+        
+        Копия бэкапа подключается к соединению записи (ATTACH), и заметка
+        вместе с вложенными копируется одной транзакцией. Заметки получают
+        новые ID, копия добавляется в конец списка заметок parent_id.
+        
+        Args:
+            snapshot_path (str): Путь к копии базы данных, подключённой attach_backup
+            note_id (int): ID заметки в бэкапе
+            parent_id (int): ID родителя для копии в текущей базе
+            with_children (bool): Копировать ли вложенные заметки
+        
+        Returns:
+            Future: Результат — ID копии заметки в текущей базе
+        """
+        future = self.writer.submit(self._copy_from_backup, snapshot_path, note_id, parent_id, with_children)
+        return self.invalidates_search(future)
+
+    def _copy_from_backup(self, cursor, snapshot_path, note_id, parent_id, with_children):
+        conn = cursor.connection
+        # Соединение записи открыто без поддержки URI, поэтому копия подключается по пути.
+        # Это временный файл, в который ничего не записывается
+        cursor.execute('ATTACH DATABASE ? AS backup', (os.path.abspath(snapshot_path),))
+        try:
+            rows = cursor.execute('''
+                WITH RECURSIVE subtree(id, depth) AS (
+                    SELECT id, 0 FROM backup.notes WHERE id = ?
+                    UNION
+                    SELECT n.id, s.depth + 1 FROM backup.notes n JOIN subtree s ON n.parent_id = s.id
+                    WHERE ?
+                )
+                SELECT n.id, n.title, n.parent_id, n.created_at, n.updated_at, n.order_index, b.content
+                FROM subtree s
+                JOIN backup.notes n ON n.id = s.id
+                LEFT JOIN backup.note_bodies b ON b.note_id = n.id
+                ORDER BY s.depth, n.order_index, n.id
+            ''', (note_id, 1 if with_children else 0)).fetchall()
+            if not rows:
+                raise ValueError(f"заметка {note_id} не найдена в бэкапе")
+            
+            cursor.execute('SELECT MAX(order_index) FROM notes WHERE parent_id = ?', (parent_id,))
+            max_order = cursor.fetchone()[0] or 0
+            new_ids = {}
+            for row in rows:
+                if row['id'] == note_id:
+                    new_parent, order_index = parent_id, max_order + 1
+                else:
+                    new_parent, order_index = new_ids[row['parent_id']], row['order_index']
+                cursor.execute(
+                    'INSERT INTO notes (title, parent_id, created_at, updated_at, order_index) VALUES (?, ?, ?, ?, ?)',
+                    (row['title'], new_parent, row['created_at'], datetime.now(), order_index)
+                )
+                new_ids[row['id']] = cursor.lastrowid
+                cursor.execute('INSERT INTO note_bodies (note_id, content) VALUES (?, ?)',
+                               (cursor.lastrowid, row['content'] or ""))
+            conn.commit()
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            cursor.execute('DETACH DATABASE backup')
+        return new_ids[note_id]
 
     def close(self):
-        if hasattr(self, 'conn'):
-            self.conn.close()
+        if getattr(self, 'searcher', None) is not None:
+            self.searcher.stop()
+            self.searcher = None
+        # Дожидаемся записи всех изменений из очереди
+        if hasattr(self, 'writer'):
+            self.writer.stop()
+        if hasattr(self, 'reader_connections'):
+            with self.readers_lock:
+                for conn in self.reader_connections:
+                    conn.close()
+                self.reader_connections = []
+            self.readers = threading.local()
 
 
 class DatabaseManager:
@@ -160,6 +1587,8 @@ class DatabaseManager:
         self.settings_file = os.path.join(base_dir, 'settings.ini')
         self.db = None
         self.db_path = None
+        # Обработчик ошибок фоновой записи (вызывается из потока записи)
+        self.on_write_error = None
         
     def init_database(self, db_path=None):
         """Инициализация базы данных"""
@@ -168,6 +1597,7 @@ class DatabaseManager:
         
         self.db_path = db_path
         self.db = NotesDB(db_path)
+        self.db.writer.on_error = self.on_write_error
         return self.db
         
     def get_db_path_from_settings(self):
@@ -211,28 +1641,38 @@ class DatabaseManager:
         )
         return file_name if file_name else None
             
-    def restore_database(self, parent_widget, backup_manager):
-        """Восстановление базы данных из бэкапа"""
-        backup_files = backup_manager.get_backup_list()
+    def choose_backup(self, parent_widget, backup_manager, title):
+        """
+        Диалог выбора бэкапа
+        
+        Returns:
+            str: Путь к выбранному бэкапу или None
+        """
+        # Сведения о бэкапах читаются из каталога, сами файлы не открываются
+        entries = backup_manager.get_backup_catalog()
+        backup_files = [os.path.join(backup_manager.backup_dir, entry['name']) for entry in entries]
         
         if not backup_files:
             QMessageBox.warning(
                 parent_widget, 
-                TRANSLATIONS[self.current_language]['restore_title'],
+                title,
                 TRANSLATIONS[self.current_language]['no_backups_found']
             )
-            return False
+            return None
         
         # Создаем диалог выбора файла
         dialog = QDialog(parent_widget)
-        dialog.setWindowTitle(TRANSLATIONS[self.current_language]['restore_title'])
+        dialog.setWindowTitle(title)
         layout = QVBoxLayout(dialog)
         
         list_widget = QListWidget()
-        for file_path in backup_files:
-            filename = os.path.basename(file_path)
-            list_widget.addItem(filename)
+        list_widget.setUniformItemSizes(True)
+        for entry in entries:
+            list_widget.addItem(self.describe_backup_entry(entry))
+            list_widget.item(list_widget.count() - 1).setToolTip(
+                f"{entry['name']}\nSHA-256: {entry['checksum'] or '-'}")
         layout.addWidget(list_widget)
+        dialog.resize(560, 360)
         
         buttons = QHBoxLayout()
         ok_button = QPushButton(TRANSLATIONS[self.current_language]['restore'])
@@ -243,48 +1683,87 @@ class DatabaseManager:
         
         ok_button.clicked.connect(dialog.accept)
         cancel_button.clicked.connect(dialog.reject)
+        list_widget.itemDoubleClicked.connect(dialog.accept)
         
         if dialog.exec() == QDialog.DialogCode.Accepted:
             selected_index = list_widget.currentRow()
             if selected_index >= 0:
-                selected_backup_path = backup_files[selected_index]
-                
-                # Выдаем предупреждение перед восстановлением
-                reply = QMessageBox.question(
-                    parent_widget, 
-                    TRANSLATIONS[self.current_language]['restore_title'],
-                    TRANSLATIONS[self.current_language]['confirm_restore'],
-                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-                )
-                if reply == QMessageBox.StandardButton.No:
-                    return False
-                
-                # Получаем путь к основной базе данных из настроек
-                main_db_path = self.get_db_path_from_settings()
-                
-                # Закрываем текущее соединение с базой данных
-                if self.db:
-                    self.db.close()
-                
-                # Восстанавливаем базу данных
-                if backup_manager.restore_backup(selected_backup_path, main_db_path):
-                    # Пересоздаем соединение с базой данных
-                    self.init_database(main_db_path)
-                    
-                    QMessageBox.information(
-                        parent_widget,
-                        TRANSLATIONS[self.current_language]['restore_title'],
-                        TRANSLATIONS[self.current_language]['restore_success']
-                    )
-                    return True
-                else:
-                    QMessageBox.critical(
-                        parent_widget,
-                        TRANSLATIONS[self.current_language]['restore_title'],
-                        "Ошибка при восстановлении базы данных"
-                    )
-                    return False
-        return False
+                return backup_files[selected_index]
+        return None
+            
+    def restore_database(self, parent_widget, backup_manager):
+        """Восстановление базы данных из бэкапа"""
+        selected_backup_path = self.choose_backup(
+            parent_widget, backup_manager, TRANSLATIONS[self.current_language]['restore_title'])
+        if selected_backup_path is None:
+            return False
+        
+        # Выдаем предупреждение перед восстановлением
+        reply = QMessageBox.question(
+            parent_widget, 
+            TRANSLATIONS[self.current_language]['restore_title'],
+            TRANSLATIONS[self.current_language]['confirm_restore'],
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply == QMessageBox.StandardButton.No:
+            return False
+        
+        # Восстанавливаем базу данных
+        if self.restore_backup_file(selected_backup_path, backup_manager):
+            QMessageBox.information(
+                parent_widget,
+                TRANSLATIONS[self.current_language]['restore_title'],
+                TRANSLATIONS[self.current_language]['restore_success']
+            )
+            return True
+        else:
+            QMessageBox.critical(
+                parent_widget,
+                TRANSLATIONS[self.current_language]['restore_title'],
+                "Ошибка при восстановлении базы данных"
+            )
+            return False
+        
+    def describe_backup_entry(self, entry):
+        """Строка списка бэкапов: дата, база, число заметок, размер и результат проверки"""
+        tr = TRANSLATIONS[self.current_language]
+        try:
+            created = datetime.fromisoformat(entry['created']).strftime('%d.%m.%Y %H:%M:%S')
+        except (TypeError, ValueError):
+            created = entry['name']
+        parts = [created, entry['database'] or '']
+        if entry['note_count'] is not None:
+            parts.append(tr['backup_note_count'] + str(entry['note_count']))
+        if entry['size'] is not None:
+            parts.append(f"{entry['size'] / (1024 * 1024):.1f} {tr['backup_size_mb']}")
+        if entry['integrity'] != 'ok':
+            parts.append(tr['backup_damaged'])
+        return ' — '.join(parts)
+
+    def restore_backup_file(self, backup_path, backup_manager):
+        """
+        Замена базы данных содержимым бэкапа
+        
+        Открытая база восстанавливается на месте, без закрытия соединений.
+        Если база не открыта, файл бэкапа копируется на место основной базы.
+        """
+        if self.db is None:
+            main_db_path = self.get_db_path_from_settings()
+            if not backup_manager.restore_backup(backup_path, main_db_path):
+                return False
+            self.init_database(main_db_path)
+            return True
+        
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            with backup_manager.open_backup(backup_path) as snapshot_path:
+                self.db.restore_from(snapshot_path, pages=backup_manager.BACKUP_PAGES).result()
+            return True
+        except Exception as e:
+            print(f"Ошибка при восстановлении бэкапа: {e}")
+            return False
+        finally:
+            QApplication.restoreOverrideCursor()
         
     def close_database(self):
         """Закрытие соединения с базой данных"""
@@ -0,0 +1,130 @@
+import os
+from datetime import datetime
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QLineEdit, QTreeWidget, QTreeWidgetItem)
+from PyQt6.QtCore import Qt, pyqtSignal
+from backup_manager import HistorySearch
+from translations import TRANSLATIONS
+
+
+class HistorySearchDialog(QDialog):
+    """
+    Поиск текста во всех бэкапах
+
+    Бэкапы просматриваются параллельно в пуле процессов, совпадения
+    добавляются в список по мере готовности. Двойной щелчок открывает
+    заметку в просмотре бэкапа.
+    """
+
+    # Совпадения из одного бэкапа и завершение поиска (из служебного потока пула)
+    hits_found = pyqtSignal(list)
+    search_finished = pyqtSignal()
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.main_window = parent
+        self.current_language = self.main_window.current_language
+        self.backup_manager = self.main_window.backup_manager
+        self.search = None
+        self.hit_count = 0
+        # Время создания бэкапов из каталога: имя файла -> дата
+        self.backup_dates = {}
+        self.hits_found.connect(self.on_hits_found)
+        self.search_finished.connect(self.on_search_finished)
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса"""
+        tr = TRANSLATIONS[self.current_language]
+        self.setWindowTitle(tr['action_history_search'])
+        layout = QVBoxLayout(self)
+
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.returnPressed.connect(self.start_search)
+        self.search_button = QPushButton(tr['history_search'])
+        self.search_button.clicked.connect(self.start_search)
+        self.stop_button = QPushButton(tr['history_stop'])
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self.stop_search)
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.search_button)
+        search_layout.addWidget(self.stop_button)
+        layout.addLayout(search_layout)
+
+        self.results = QTreeWidget()
+        self.results.setRootIsDecorated(False)
+        self.results.setUniformRowHeights(True)
+        self.results.setHeaderLabels([tr['history_col_backup'], tr['history_col_note'], tr['history_col_text']])
+        self.results.setColumnWidth(0, 140)
+        self.results.setColumnWidth(1, 160)
+        self.results.setSortingEnabled(True)
+        self.results.sortByColumn(0, Qt.SortOrder.DescendingOrder)
+        self.results.itemDoubleClicked.connect(self.open_hit)
+        layout.addWidget(self.results)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        self.resize(760, 480)
+
+    def start_search(self):
+        """Запуск поиска по всем бэкапам"""
+        text = self.search_input.text()
+        if not text:
+            return
+        self.stop_search()
+        self.results.clear()
+        self.hit_count = 0
+        self.backup_dates = {entry['name']: entry['created'] for entry in self.backup_manager.get_backup_catalog()}
+        self.search_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.status_label.setText(TRANSLATIONS[self.current_language]['history_searching'] + "0")
+        self.search = HistorySearch(self.backup_manager, text, self.hits_found.emit, self.search_finished.emit)
+        self.search.start()
+
+    def stop_search(self):
+        """Остановка выполняющегося поиска"""
+        if self.search is None:
+            return
+        self.search.cancel()
+        self.search = None
+        self.search_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        self.status_label.setText(TRANSLATIONS[self.current_language]['history_stopped'] + str(self.hit_count))
+
+    def on_hits_found(self, hits):
+        """Добавление совпадений из очередного бэкапа"""
+        if self.search is None:
+            return
+        for backup_name, note_id, title, snippet in hits:
+            created = self.backup_dates.get(backup_name)
+            try:
+                date_text = datetime.fromisoformat(created).strftime('%Y-%m-%d %H:%M:%S')
+            except (TypeError, ValueError):
+                date_text = backup_name
+            item = QTreeWidgetItem([date_text, title, snippet])
+            item.setData(0, Qt.ItemDataRole.UserRole, (backup_name, note_id))
+            item.setToolTip(0, backup_name)
+            self.results.addTopLevelItem(item)
+        self.hit_count += len(hits)
+        self.status_label.setText(TRANSLATIONS[self.current_language]['history_searching'] + str(self.hit_count))
+
+    def on_search_finished(self):
+        """Завершение поиска"""
+        if self.search is None:
+            return
+        self.search = None
+        self.search_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        self.status_label.setText(TRANSLATIONS[self.current_language]['history_found'] + str(self.hit_count))
+
+    def open_hit(self, item, column):
+        """Открытие найденной заметки в просмотре бэкапа"""
+        backup_name, note_id = item.data(0, Qt.ItemDataRole.UserRole)
+        self.main_window.browse_backup(os.path.join(self.backup_manager.backup_dir, backup_name), note_id)
+
+    def done(self, result):
+        # Поиск останавливается при любом закрытии диалога
+        self.stop_search()
+        super().done(result)
@@ -1,18 +1,24 @@
 import sys
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                            QHBoxLayout, QTreeWidget, QTreeWidgetItem, QTextEdit,
+                            QHBoxLayout, QTreeView, QTextEdit,
                             QPushButton, QMenu, QMessageBox, QInputDialog, QToolBar,
                             QLabel, QSplitter, QDialog, QLineEdit, QFormLayout,
                             QCheckBox, QSpinBox, QComboBox, QFileDialog, QGroupBox,
                             QListWidget)
-from PyQt6.QtCore import Qt, QSize, QSettings, QTimer
+from PyQt6.QtCore import Qt, QSize, QSettings, QTimer, QModelIndex, pyqtSignal
 from PyQt6.QtGui import QAction, QIcon, QKeySequence, QFontDatabase, QFont, QGuiApplication
 from PyQt6.QtGui import QTextCursor
 from PyQt6.QtGui import QDesktopServices
 from PyQt6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor
 from PyQt6.QtCore import QUrl
 import re
-from database_manager import DatabaseManager
+from database_manager import DatabaseManager, compile_search
+from note_query import parse_query
+from note_tree_model import NoteTreeModel
+from backup_browser_dialog import BackupBrowserDialog
+from history_search_dialog import HistorySearchDialog
+from search_panel import SearchPanel
+from backup_diff_dialog import BackupDiffDialog
 from config import Config
 from settings_dialog import SettingsDialog
 from toolbar_manager import ToolbarManager
@@ -21,8 +27,9 @@ import configparser
 import shutil
 from datetime import datetime, timedelta
 import socket
+import multiprocessing
 from translations import TRANSLATIONS
-from backup_manager import BackupManager, init_backup_manager, register_exit_handler
+from backup_manager import BackupManager, BackupScheduler, init_backup_manager, register_exit_handler
 
 # Определяем пути к файлам
 if getattr(sys, 'frozen', False):
@@ -43,6 +50,9 @@ init_backup_manager(BASE_DIR)
 register_exit_handler()
 
 class SearchDialog(QDialog):
+    # Задержка поиска по мере ввода после последнего нажатия клавиши, мс
+    SEARCH_DELAY_MS = 250
+
     def __init__(self, parent=None, replace_mode=False, title=None):
         super().__init__(parent)
         
@@ -69,6 +79,29 @@ class SearchDialog(QDialog):
             self.replace_edit = QLineEdit()
             layout.addRow(TRANSLATIONS[current_language]['search_replace_with'], self.replace_edit)
         
+        # Режимы поиска (по умолчанию — как в прошлый раз)
+        options = parent.search_options if parent is not None else {}
+        self.regex_check = QCheckBox(TRANSLATIONS[current_language]['search_regex'])
+        self.regex_check.setChecked(options.get('regex', False))
+        self.ignore_case_check = QCheckBox(TRANSLATIONS[current_language]['search_ignore_case'])
+        self.ignore_case_check.setChecked(options.get('ignore_case', False))
+        self.whole_word_check = QCheckBox(TRANSLATIONS[current_language]['search_whole_word'])
+        self.whole_word_check.setChecked(options.get('whole_word', False))
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(self.regex_check)
+        options_layout.addWidget(self.ignore_case_check)
+        options_layout.addWidget(self.whole_word_check)
+        layout.addRow("", options_layout)
+        
+        # Запрос с условиями (title:, in:, modified:...) — только для поиска
+        self.query_check = None
+        if not replace_mode:
+            self.query_check = QCheckBox(TRANSLATIONS[current_language]['search_query'])
+            self.query_check.setToolTip(TRANSLATIONS[current_language]['search_query_help'])
+            self.query_check.toggled.connect(self.update_query_mode)
+            self.query_check.setChecked(options.get('query', False))
+            layout.addRow("", self.query_check)
+        
         # Кнопки
         buttons_layout = QHBoxLayout()
         self.find_button = QPushButton(TRANSLATIONS[current_language]['search_find'])
@@ -88,9 +121,45 @@ class SearchDialog(QDialog):
         
         # Устанавливаем фокус на поле поиска
         self.search_edit.setFocus()
+        
+        # Поиск по мере ввода: запускается после паузы в наборе, результаты
+        # появляются на панели результатов главного окна
+        if not replace_mode and parent is not None:
+            self.search_timer = QTimer(self)
+            self.search_timer.setSingleShot(True)
+            self.search_timer.setInterval(self.SEARCH_DELAY_MS)
+            self.search_timer.timeout.connect(
+                lambda: parent.start_background_search(self.search_edit.text(), jump=False,
+                                                       options=self.search_options()))
+            self.search_edit.textChanged.connect(lambda text: self.search_timer.start())
+            for check in (self.regex_check, self.ignore_case_check, self.whole_word_check, self.query_check):
+                check.toggled.connect(lambda checked: self.search_timer.start())
+
+    def update_query_mode(self, checked):
+        """Запрос с условиями всегда без учёта регистра, остальные режимы к нему не применяются"""
+        for check in (self.regex_check, self.ignore_case_check, self.whole_word_check):
+            check.setEnabled(not checked)
+
+    def search_options(self):
+        """Выбранные режимы поиска (параметры NotesDB.search_content)"""
+        options = {
+            'regex': self.regex_check.isChecked(),
+            'ignore_case': self.ignore_case_check.isChecked(),
+            'whole_word': self.whole_word_check.isChecked(),
+        }
+        if self.query_check is not None:
+            options['query'] = self.query_check.isChecked()
+        return options
 
 class NotesApp(QMainWindow):
     SETTINGS_FILE = os.path.join(BASE_DIR, 'settings.ini')
+    # Ошибка фоновой записи в базу данных (передаётся из потока записи в поток интерфейса)
+    db_write_failed = pyqtSignal(str)
+    # Заметка записана в базу данных фоновым потоком
+    note_saved = pyqtSignal()
+    # Ход и завершение фонового бэкапа (скопировано страниц, всего страниц / путь к бэкапу)
+    backup_progress = pyqtSignal(int, int)
+    backup_finished = pyqtSignal(object)
 
     class PlainTextPasteEdit(QTextEdit):
         """Редактор, который всегда вставляет простой текст."""
@@ -212,6 +281,10 @@ class NotesApp(QMainWindow):
         
         # Инициализация основных переменных
         self.init_ui()
+        self.db_write_failed.connect(self.on_db_write_failed)
+        self.note_saved.connect(self.on_note_saved)
+        self.backup_progress.connect(self.on_backup_progress)
+        self.backup_finished.connect(self.on_backup_finished)
         
         # Загружаем текущий язык интерфейса
         config = Config()
@@ -275,6 +348,11 @@ class NotesApp(QMainWindow):
         # Загружаем заметки
         self.load_notes()
         
+        # Периодический бэкап базы данных, если она изменилась
+        self.backup_scheduler = BackupScheduler(
+            self.backup_manager, self.db.db_path, self.backup_db, Config().get('backup_interval', 10) * 60)
+        self.backup_scheduler.start()
+        
         # Устанавливаем заголовок окна
         self.setWindowTitle(TRANSLATIONS[self.current_language]['window_title'])
         self.setWindowIcon(QIcon(os.path.join(ICONS_DIR, 'app.ico')))
@@ -304,6 +382,9 @@ class NotesApp(QMainWindow):
         # Инициализация переменных состояния
         self.current_note_id = None
         self.current_parent_id = 1
+        self.cut_note_id = None  # Заметка, вырезанная для переноса в другую ветку
+        # Режимы поиска и замены: регулярное выражение, без учёта регистра, целые слова
+        self.search_options = {'regex': False, 'ignore_case': False, 'whole_word': False, 'query': False}
         self.content_modified = False
         self.editing_title = False
         self.last_search_text = ""
@@ -311,6 +392,18 @@ class NotesApp(QMainWindow):
         self.restored_geometry = False
         self.programmatic_load = False  # Флаг для предотвращения срабатывания textChanged
         
+        # Автосохранение: изменения копятся и записываются после паузы в редактировании
+        config = Config()
+        self.auto_save = config.get('auto_save', True)
+        self.save_interval = config.get('save_interval', 5)  # секунды
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setSingleShot(True)
+        self.autosave_timer.timeout.connect(self.save_current_note)
+        
+        # Бэкапы создаются в фоновом потоке, редактирование при этом не блокируется
+        self.backup_manager = BackupManager(BASE_DIR)
+        self.backup_future = None
+        
         # Инициализация менеджера панели инструментов
         self.toolbar_manager = None
         # Состояние развёрнутости дерева заметок (множество note_id)
@@ -323,6 +416,7 @@ class NotesApp(QMainWindow):
             self.current_language = "Русский"
             
         self.db_manager = DatabaseManager(BASE_DIR, self.current_language)
+        self.db_manager.on_write_error = self.db_write_failed.emit
         self.db_manager.init_database(db_path)
         self.db = self.db_manager.db  # Для обратной совместимости
 
@@ -443,10 +537,22 @@ class NotesApp(QMainWindow):
         file_menu.addAction(change_db_action)
         # --- Конец нового пункта ---
         
+        backup_db_action = QAction(TRANSLATIONS[self.current_language]['action_backup_db'], self)
+        backup_db_action.triggered.connect(self.backup_db)
+        file_menu.addAction(backup_db_action)
+        
         # --- Новый пункт для восстановления базы данных ---
         restore_db_action = QAction(TRANSLATIONS[self.current_language]['action_restore_db'], self)
         restore_db_action.triggered.connect(self.restore_db)
         file_menu.addAction(restore_db_action)
+        
+        restore_notes_action = QAction(TRANSLATIONS[self.current_language]['action_restore_notes'], self)
+        restore_notes_action.triggered.connect(self.restore_notes)
+        file_menu.addAction(restore_notes_action)
+        
+        backup_diff_action = QAction(TRANSLATIONS[self.current_language]['action_backup_diff'], self)
+        backup_diff_action.triggered.connect(self.show_backup_diff_dialog)
+        file_menu.addAction(backup_diff_action)
         # --- Конец нового пункта ---
         
         file_menu.addSeparator()
@@ -484,6 +590,26 @@ class NotesApp(QMainWindow):
         move_down_action.triggered.connect(self.move_note_down)
         notes_menu.addAction(move_down_action)
 
+        # Вырезать/вставить заметку (перенос в другую ветку).
+        # Сочетания клавиш действуют только в дереве, чтобы не мешать редактору.
+        # Меню пересоздаётся при смене языка — прежние действия убираются из дерева
+        for action in (getattr(self, 'cut_note_action', None), getattr(self, 'paste_note_action', None)):
+            if action is not None:
+                self.tree.removeAction(action)
+        self.cut_note_action = QAction(TRANSLATIONS[self.current_language]['action_cut_note'], self)
+        self.cut_note_action.setShortcut("Ctrl+X")
+        self.cut_note_action.setShortcutContext(Qt.ShortcutContext.WidgetShortcut)
+        self.cut_note_action.triggered.connect(self.cut_note)
+        notes_menu.addAction(self.cut_note_action)
+
+        self.paste_note_action = QAction(TRANSLATIONS[self.current_language]['action_paste_note'], self)
+        self.paste_note_action.setShortcut("Ctrl+V")
+        self.paste_note_action.setShortcutContext(Qt.ShortcutContext.WidgetShortcut)
+        self.paste_note_action.triggered.connect(self.paste_note)
+        notes_menu.addAction(self.paste_note_action)
+        self.tree.addAction(self.cut_note_action)
+        self.tree.addAction(self.paste_note_action)
+
         notes_menu.addSeparator()
 
         find_action = QAction(TRANSLATIONS[self.current_language]['action_find'], self)
@@ -505,6 +631,19 @@ class NotesApp(QMainWindow):
         replace_all_action.triggered.connect(self.show_replace_all_dialog)
         notes_menu.addAction(replace_all_action)
         
+        self.undo_replace_all_action = QAction(TRANSLATIONS[self.current_language]['action_undo_replace_all'], self)
+        self.undo_replace_all_action.triggered.connect(self.undo_replace_all)
+        self.undo_replace_all_action.setEnabled(getattr(self, 'db', None) is not None and self.db.replace_undo_available)
+        notes_menu.addAction(self.undo_replace_all_action)
+        
+        # Показ/скрытие панели результатов поиска
+        self.search_panel.update_language()
+        notes_menu.addAction(self.search_panel.toggleViewAction())
+        
+        history_search_action = QAction(TRANSLATIONS[self.current_language]['action_history_search'], self)
+        history_search_action.triggered.connect(self.show_history_search_dialog)
+        notes_menu.addAction(history_search_action)
+        
         notes_menu.addSeparator()
         
         delete_action = QAction(TRANSLATIONS[self.current_language]['action_delete'], self)
@@ -564,18 +703,32 @@ class NotesApp(QMainWindow):
         left_panel = QWidget()
         left_layout = QVBoxLayout(left_panel)
         
-        # Создаем дерево заметок
-        self.tree = QTreeWidget()
+        # Создаем дерево заметок: модель подгружает ветки из базы по мере раскрытия
+        self.tree_model = NoteTreeModel()
+        self.tree = QTreeView()
+        self.tree.setModel(self.tree_model)
         self.tree.setHeaderHidden(True)  # Скрываем заголовок
-        self.tree.itemClicked.connect(self.on_note_selected)
-        self.tree.itemDoubleClicked.connect(self.on_note_double_clicked)
-        self.tree.currentItemChanged.connect(self.on_current_item_changed)
-        self.tree.itemChanged.connect(self.on_item_changed)
+        self.tree.setUniformRowHeights(True)  # Отрисовываются только видимые строки
+        self.tree.setEditTriggers(QTreeView.EditTrigger.NoEditTriggers)
+        # Перетаскивание заметок мышью: изменение порядка и перенос в другую ветку
+        self.tree.setDragEnabled(True)
+        self.tree.setAcceptDrops(True)
+        self.tree.setDropIndicatorShown(True)
+        self.tree.setDragDropMode(QTreeView.DragDropMode.InternalMove)
+        self.tree.clicked.connect(self.on_note_selected)
+        self.tree.doubleClicked.connect(self.on_note_double_clicked)
+        self.tree.selectionModel().currentChanged.connect(self.on_current_item_changed)
         # Отслеживаем разворачивание/сворачивание веток
-        self.tree.itemExpanded.connect(self.on_item_expanded)
-        self.tree.itemCollapsed.connect(self.on_item_collapsed)
+        self.tree.expanded.connect(self.on_item_expanded)
+        self.tree.collapsed.connect(self.on_item_collapsed)
+        self.tree_model.rowsMoved.connect(self.on_notes_moved)
         left_layout.addWidget(self.tree)
         
+        # Панель результатов поиска: вхождения добавляются по мере нахождения
+        self.search_panel = SearchPanel(self)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.search_panel)
+        self.search_panel.hide()
+        
         # Добавляем левую панель в главный layout
         layout.addWidget(left_panel, 1)
         
@@ -593,6 +746,10 @@ class NotesApp(QMainWindow):
         # Добавляем правую панель в главный layout
         layout.addWidget(right_panel, 2)
         
+        # Строка состояния: время последнего сохранения
+        self.save_status_label = QLabel()
+        self.statusBar().addPermanentWidget(self.save_status_label)
+        
         # Создаем меню
         self.create_menu()
         
@@ -600,90 +757,49 @@ class NotesApp(QMainWindow):
         self.create_toolbar()
 
     def load_notes(self):
-        """Загрузка заметок из базы данных"""
-        self.tree.clear()
-        
-        # Получаем все заметки из БД
-        notes = self.db.get_all_notes()
+        """Загрузка заметок из базы данных (только верхний уровень, остальное — при раскрытии)"""
+        # Модель читает только заголовки верхнего уровня, без содержимого
+        self.tree_model.set_database(self.db)
         
-        # Создаем словарь для быстрого доступа к элементам дерева
-        tree_items = {}
-        
-        # Сначала создаем все элементы дерева верхнего уровня
-        for note in notes:
-            note_id, title, content, parent_id, order_index = note
-            
-            if parent_id == 1:  # Если это заметка верхнего уровня
-                item = QTreeWidgetItem(self.tree, [title])
-                item.setData(0, Qt.ItemDataRole.UserRole, note_id)
-                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)  # Делаем элемент редактируемым
-                tree_items[note_id] = item
-        
-        # Затем добавляем дочерние элементы
-        for note in notes:
-            note_id, title, content, parent_id, order_index = note
-            
-            if parent_id != 1:  # Если это вложенная заметка
-                parent_item = tree_items.get(parent_id)
-                if parent_item:
-                    item = QTreeWidgetItem(parent_item, [title])
-                    item.setData(0, Qt.ItemDataRole.UserRole, note_id)
-                    item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)  # Делаем элемент редактируемым
-                    tree_items[note_id] = item
-        
-        # Применяем сохранённое состояние раскрытия
-        def apply_expand_state(item):
-            note_id = item.data(0, Qt.ItemDataRole.UserRole)
-            if note_id in self.expanded_note_ids:
-                self.tree.expandItem(item)
-            for idx in range(item.childCount()):
-                apply_expand_state(item.child(idx))
-
-        # По умолчанию сворачиваем всё
-        self.tree.collapseAll()
-        # Применяем состояние для каждого верхнего уровня
-        for i in range(self.tree.topLevelItemCount()):
-            apply_expand_state(self.tree.topLevelItem(i))
+        # Применяем сохранённое состояние раскрытия: дочерние уровни
+        # подгружаются в on_item_expanded по мере раскрытия
+        self.restore_expanded(QModelIndex())
         
         # Выбираем первую заметку, если она есть
-        if self.tree.topLevelItemCount() > 0:
-            first_item = self.tree.topLevelItem(0)
+        first_index = self.tree_model.index(0, 0)
+        if first_index.isValid():
             self.programmatic_load = True  # Устанавливаем флаг перед программным выбором
-            self.tree.setCurrentItem(first_item)
+            self.tree.setCurrentIndex(first_index)
             self.programmatic_load = False  # Сбрасываем флаг после программного выбора
-            self.on_note_selected(first_item)
+            self.on_note_selected(first_index)
+
+    def restore_expanded(self, parent_index):
+        """Раскрытие дочерних узлов, которые были раскрыты в прошлый раз"""
+        for row in range(self.tree_model.rowCount(parent_index)):
+            index = self.tree_model.index(row, 0, parent_index)
+            if self.tree_model.note_id(index) in self.expanded_note_ids and not self.tree.isExpanded(index):
+                self.tree.expand(index)
+
+    def current_tree_note_id(self):
+        """ID заметки, выбранной в дереве (None, если ничего не выбрано)"""
+        return self.tree_model.note_id(self.tree.currentIndex())
 
     def select_note_by_id(self, note_id):
-        """Выбор заметки по ID (ищет во всём дереве, включая вложенные)."""
-        def find_in_subtree(root_item):
-            if root_item.data(0, Qt.ItemDataRole.UserRole) == note_id:
-                return root_item
-            for idx in range(root_item.childCount()):
-                found = find_in_subtree(root_item.child(idx))
-                if found is not None:
-                    return found
-            return None
-
-        found_item = None
-        for i in range(self.tree.topLevelItemCount()):
-            top_item = self.tree.topLevelItem(i)
-            found_item = find_in_subtree(top_item)
-            if found_item is not None:
-                break
-
-        if found_item is not None:
+        """Выбор заметки по ID (при необходимости подгружает ветки дерева, ведущие к заметке)."""
+        index = self.tree_model.index_for_note(note_id, load=True)
+        if index.isValid():
             self.programmatic_load = True
-            self.tree.setCurrentItem(found_item)
-            self.tree.scrollToItem(found_item)
+            self.tree.setCurrentIndex(index)
+            self.tree.scrollTo(index)
             self.programmatic_load = False
             # Явно загружаем содержимое выбранной заметки
-            self.on_note_selected(found_item)
+            self.on_note_selected(index)
 
     def new_note(self):
         """Создать новую заметку"""
         try:
             note_id = self.db.add_note("Новая заметка", "", self.current_parent_id)
-            self.load_notes()
+            self.tree_model.insert_note(note_id, self.current_parent_id, "Новая заметка")
             self.select_note_by_id(note_id)
             self.current_note_id = note_id  # Явно устанавливаем текущий note_id
             self.editor.clear()
@@ -694,43 +810,58 @@ class NotesApp(QMainWindow):
 
     def new_subnote(self):
         """Создать новую вложенную заметку"""
-        current_item = self.tree.currentItem()
-        if not current_item:
+        parent_id = self.current_tree_note_id()
+        if not parent_id:
             return
-        parent_id = current_item.data(0, Qt.ItemDataRole.UserRole)
         try:
             note_id = self.db.add_note("Новая заметка", "", parent_id)
-            self.load_notes()
+            self.tree_model.insert_note(note_id, parent_id, "Новая заметка")
             self.select_note_by_id(note_id)
             self.start_rename()
         except Exception as e:
             print(f"DEBUG: Ошибка при создании вложенной заметки: {str(e)}")
 
+    def schedule_autosave(self):
+        """Перезапуск таймера автосохранения: запись произойдёт после паузы в редактировании"""
+        if self.auto_save and self.current_note_id:
+            self.autosave_timer.start(max(1, self.save_interval) * 1000)
+
     def save_current_note(self):
         """Сохранение текущей заметки"""
+        self.autosave_timer.stop()
         if not self.current_note_id or not self.content_modified:
             return
             
         content = self.editor.toPlainText()
         
         try:
-            # Получаем текущую заметку
-            note = self.db.get_note(self.current_note_id)
-            if note:
-                # Сохраняем с тем же заголовком
-                self.db.save_note(self.current_note_id, note[1], content)
-                self.content_modified = False
+            # Записывается только содержимое; если оно не изменилось, база не трогается.
+            # Запись выполняется в фоновом потоке
+            future = self.db.update_content(self.current_note_id, content)
+            future.add_done_callback(
+                lambda done: self.note_saved.emit() if done.exception() is None and done.result() else None)
+            self.content_modified = False
         except Exception as e:
             QMessageBox.critical(self, TRANSLATIONS[self.current_language]['error_title'], 
                                TRANSLATIONS[self.current_language]['error_save_note'] + f": {str(e)}")
 
+    def on_note_saved(self):
+        """Отображение времени последнего сохранения в строке состояния"""
+        self.save_status_label.setText(
+            TRANSLATIONS[self.current_language]['status_saved'] + datetime.now().strftime('%H:%M:%S'))
+
+    def on_db_write_failed(self, error):
+        """Сообщение об ошибке фоновой записи в базу данных"""
+        QMessageBox.critical(self, TRANSLATIONS[self.current_language]['error_title'],
+                           TRANSLATIONS[self.current_language]['error_save_note'] + f": {error}")
+
     def delete_note(self):
         """Удаление заметки"""
-        current_item = self.tree.currentItem()
-        if not current_item:
+        current_index = self.tree.currentIndex()
+        if not current_index.isValid():
             return
             
-        note_id = current_item.data(0, Qt.ItemDataRole.UserRole)
+        note_id = self.tree_model.note_id(current_index)
         
         # Не позволяем удалить корневую заметку
         if note_id == 1:
@@ -740,30 +871,18 @@ class NotesApp(QMainWindow):
         
         # Определяем, кого выделить после удаления: предыдущего соседа, иначе родителя
         target_note_id = None
-        parent_item = current_item.parent()
-        if parent_item:
-            idx = parent_item.indexOfChild(current_item)
-            if idx > 0:
-                prev_sibling = parent_item.child(idx - 1)
-                target_note_id = prev_sibling.data(0, Qt.ItemDataRole.UserRole)
-            else:
-                target_note_id = parent_item.data(0, Qt.ItemDataRole.UserRole)
-        else:
-            # Верхний уровень
-            idx = self.tree.indexOfTopLevelItem(current_item)
-            if idx > 0:
-                prev_top = self.tree.topLevelItem(idx - 1)
-                target_note_id = prev_top.data(0, Qt.ItemDataRole.UserRole)
-            else:
-                # Нет предыдущего сверху — попробуем выбрать следующий после удаления
-                if self.tree.topLevelItemCount() > 1:
-                    next_top = self.tree.topLevelItem(idx + 1)
-                    target_note_id = next_top.data(0, Qt.ItemDataRole.UserRole)
-                else:
-                    target_note_id = None
+        parent_index = current_index.parent()
+        row = current_index.row()
+        if row > 0:
+            target_note_id = self.tree_model.note_id(current_index.siblingAtRow(row - 1))
+        elif parent_index.isValid():
+            target_note_id = self.tree_model.note_id(parent_index)
+        elif self.tree_model.rowCount(parent_index) > 1:
+            # Верхний уровень без предыдущего соседа — выбираем следующий после удаления
+            target_note_id = self.tree_model.note_id(current_index.siblingAtRow(row + 1))
 
         # Готовим текст подтверждения с учётом наличия подзаметок
-        has_children = current_item.childCount() > 0
+        has_children = self.tree_model.hasChildren(current_index)
         confirm_text = TRANSLATIONS[self.current_language]['confirm_delete']
         if has_children:
             confirm_text = (confirm_text + "\n\n" +
@@ -776,23 +895,29 @@ class NotesApp(QMainWindow):
         if reply == QMessageBox.StandardButton.Yes:
             try:
                 self.db.delete_note(note_id)
-                self.load_notes()
+                if self.current_note_id == note_id:
+                    # Удалённую заметку больше не нужно сохранять
+                    self.current_note_id = None
+                    self.content_modified = False
+                self.programmatic_load = True  # Смена текущего элемента при удалении не загружает заметку
+                self.tree_model.remove_note(note_id)
+                self.programmatic_load = False
                 # Выполняем выбор рассчитанной заметки, если есть
                 if target_note_id:
                     self.select_note_by_id(target_note_id)
             except Exception as e:
                 print(f"DEBUG: Ошибка при удалении заметки: {str(e)}")
 
-    def on_note_selected(self, item):
+    def on_note_selected(self, index):
         """Обработка выбора заметки"""
         # Сохраняем предыдущую заметку
         if self.current_note_id and self.content_modified:
             self.save_current_note()
         
-        if not item:
+        if not index.isValid():
             return
             
-        note_id = item.data(0, Qt.ItemDataRole.UserRole)
+        note_id = self.tree_model.note_id(index)
         if not note_id:
             return
             
@@ -813,10 +938,10 @@ class NotesApp(QMainWindow):
         # Сбрасываем флаг изменения
         self.content_modified = False
 
-    def on_note_double_clicked(self, item, column):
+    def on_note_double_clicked(self, index):
         """Обработка двойного клика по заметке"""
-        if column == 0:  # Только для заголовка
-            self.tree.editItem(item, column)
+        if index.column() == 0:  # Только для заголовка
+            self.tree.edit(index)
 
     def show_context_menu(self, position):
         """Показ контекстного меню"""
@@ -830,6 +955,11 @@ class NotesApp(QMainWindow):
         
         menu.addSeparator()
         
+        menu.addAction(self.cut_note_action)
+        menu.addAction(self.paste_note_action)
+        
+        menu.addSeparator()
+        
         delete_action = menu.addAction(QIcon(os.path.join(ICONS_DIR, "delete.png")), "Удалить")
         delete_action.triggered.connect(self.delete_note)
         
@@ -841,6 +971,7 @@ class NotesApp(QMainWindow):
             return
             
         self.content_modified = True
+        self.schedule_autosave()
 
     def closeEvent(self, event):
         """Обработка закрытия окна"""
@@ -850,6 +981,19 @@ class NotesApp(QMainWindow):
         # Сохраняем настройки
         self.save_window_settings()
         
+        # Прерываем фоновый поиск
+        self.search_panel.stop_search()
+
+        # Дожидаемся записи изменений из очереди, чтобы планировщик увидел
+        # их при остановке и отметил для бэкапа при следующем запуске
+        if getattr(self, 'db', None) is not None:
+            self.db.writer.flush()
+
+        # Останавливаем планировщик бэкапов: выполняющийся бэкап прерывается,
+        # несохранённые в бэкап изменения копируются при следующем запуске
+        if hasattr(self, 'backup_scheduler'):
+            self.backup_scheduler.stop()
+        
         # Закрываем соединение с базой данных
         if hasattr(self, 'db_manager') and self.db_manager:
             self.db_manager.close_database()
@@ -858,11 +1002,11 @@ class NotesApp(QMainWindow):
 
     def start_rename(self):
         """Начать редактирование заголовка"""
-        current_item = self.tree.currentItem()
-        if current_item:
-            self.tree.setEditTriggers(QTreeWidget.EditTrigger.DoubleClicked | QTreeWidget.EditTrigger.EditKeyPressed)
-            self.tree.editItem(current_item, 0)
-            self.tree.setEditTriggers(QTreeWidget.EditTrigger.NoEditTriggers)
+        current_index = self.tree.currentIndex()
+        if current_index.isValid():
+            self.tree.setEditTriggers(QTreeView.EditTrigger.DoubleClicked | QTreeView.EditTrigger.EditKeyPressed)
+            self.tree.edit(current_index)
+            self.tree.setEditTriggers(QTreeView.EditTrigger.NoEditTriggers)
 
     def show_about(self):
         """Показать информацию о программе"""
@@ -895,6 +1039,10 @@ class NotesApp(QMainWindow):
             # Применяем и сохраняем новые настройки
             self.font_size = new_settings['font_size']
             self.apply_theme()
+            self.auto_save = new_settings['auto_save']
+            self.save_interval = new_settings['save_interval']
+            if not self.auto_save:
+                self.autosave_timer.stop()
             
             # Проверяем, изменился ли путь к БД
             new_db_path = new_settings['db_path']
@@ -904,6 +1052,7 @@ class NotesApp(QMainWindow):
                 # Инициализируем новую
                 self.db_manager.init_database(new_db_path)
                 self.db = self.db_manager.db
+                self.backup_scheduler.set_database(self.db.db_path)
                 # Перезагружаем заметки
                 self.load_notes()
 
@@ -932,9 +1081,6 @@ class NotesApp(QMainWindow):
             if self.current_note_id and self.content_modified:
                 self.save_current_note()
             
-            # Очищаем только дерево заметок, но не редактор
-            self.tree.clear()
-            
             # Удаляем старую панель инструментов через менеджер
             if hasattr(self, 'toolbar_manager') and self.toolbar_manager:
                 self.toolbar_manager.remove_toolbar()
@@ -989,33 +1135,77 @@ class NotesApp(QMainWindow):
         if dialog.exec() == QDialog.DialogCode.Accepted:
             search_text = dialog.search_edit.text()
             if search_text:
-                self.last_search_text = search_text
-                self.collect_search_results(search_text)
-                self.find_next()
+                self.start_background_search(search_text, options=dialog.search_options())
         else:
             if hasattr(self, 'search_results'):
                 delattr(self, 'search_results')
 
+    def start_background_search(self, text, jump=True, options=None):
+        """
+        Поиск в фоновом потоке с выводом вхождений на панель результатов
+
+        Предыдущий поиск отменяется. Если jump, к первому найденному вхождению
+        выполняется переход, дальше по вхождениям можно идти по F3 или щелчком
+        на панели. options — режимы поиска (см. SearchDialog.search_options).
+        """
+        if options is not None:
+            self.search_options = options
+        if not text:
+            self.search_panel.stop_search()
+            return
+        try:
+            if self.search_options.get('query'):
+                parse_query(text)
+            else:
+                compile_search(text, **self.text_search_options())
+        except re.error as e:
+            # Выражение может быть ещё не дописано — ошибка показывается на панели
+            self.search_panel.show_error(TRANSLATIONS[self.current_language]['search_regex_error'] + f": {str(e)}")
+            return
+        except ValueError as e:
+            self.search_panel.show_error(TRANSLATIONS[self.current_language]['search_query_error'] + f": {str(e)}")
+            return
+        self.last_search_text = text
+        self.search_results = []
+        self.search_result_index = -1
+        self.jump_to_first_hit = jump
+        self.search_panel.start_search(text)
+
+    def text_search_options(self):
+        """Режимы поиска текста без режима запроса с условиями (для compile_search и замены)"""
+        return {key: value for key, value in self.search_options.items() if key != 'query'}
+
+    def on_search_hits(self, hits):
+        """Вхождения, найденные фоновым поиском: (note_id, start, end)"""
+        if not hasattr(self, 'search_results'):
+            self.search_results = []
+        self.search_results.extend(hits)
+        if getattr(self, 'jump_to_first_hit', False) and self.search_results:
+            self.jump_to_first_hit = False
+            self.find_next()
+
+    def open_search_hit(self, note_id, start, end):
+        """Открытие заметки с выделенным вхождением (щелчок на панели результатов)"""
+        self.jump_to_first_hit = False
+        if (note_id, start, end) in getattr(self, 'search_results', []):
+            # F3 продолжит с выбранного вхождения
+            self.search_result_index = self.search_results.index((note_id, start, end))
+        self.select_note_by_id(note_id)
+        self.highlight_in_note(start, end)
+
     def collect_search_results(self, text):
         """Собирает все вхождения текста по всем заметкам"""
-        self.search_results = []  # (note_id, start, end)
-        
-        # Получаем все заметки из базы данных
-        notes = self.db.get_all_notes()
-        
-        for note in notes:
-            note_id, title, content, parent_id, order_index = note
-            if note_id == 1:  # Пропускаем корневую заметку
-                continue
-            if content is None:
-                content = ""
-            idx = 0
-            while True:
-                idx = content.find(text, idx)
-                if idx == -1:
-                    break
-                self.search_results.append((note_id, idx, idx+len(text)))
-                idx += len(text) if len(text) > 0 else 1
+        # Поиск выполняется по полнотекстовому индексу базы данных
+        try:
+            self.search_results = self.db.search_content(text, **self.search_options)  # (note_id, start, end)
+        except re.error as e:
+            QMessageBox.warning(self, TRANSLATIONS[self.current_language]['warning_title'],
+                              TRANSLATIONS[self.current_language]['search_regex_error'] + f": {str(e)}")
+            self.search_results = []
+        except ValueError as e:
+            QMessageBox.warning(self, TRANSLATIONS[self.current_language]['warning_title'],
+                              TRANSLATIONS[self.current_language]['search_query_error'] + f": {str(e)}")
+            self.search_results = []
         self.search_result_index = -1
 
     def find_next(self):
@@ -1060,6 +1250,16 @@ class NotesApp(QMainWindow):
         self.select_note_by_id(note_id)
         # заменяем текст
         content = self.editor.toPlainText()
+        if self.search_options['regex']:
+            # Подстановка групп (\1, \g<name>) из найденного совпадения
+            match = compile_search(search_text, **self.text_search_options()).search(content, start)
+            if match is not None and match.span() == (start, end):
+                try:
+                    replace_text = match.expand(replace_text)
+                except re.error as e:
+                    QMessageBox.warning(self, TRANSLATIONS[self.current_language]['warning_title'],
+                                      TRANSLATIONS[self.current_language]['search_regex_error'] + f": {str(e)}")
+                    return
         new_content = content[:start] + replace_text + content[end:]
         self.programmatic_load = True  # Устанавливаем флаг перед заменой
         self.editor.setPlainText(new_content)
@@ -1075,29 +1275,61 @@ class NotesApp(QMainWindow):
             search_text = dialog.search_edit.text()
             replace_text = dialog.replace_edit.text()
             if search_text:
+                self.search_options = dialog.search_options()
                 self.last_search_text = search_text
                 self.last_replace_text = replace_text
                 self.replace_text(search_text, replace_text)
 
     def replace_all(self, search_text, replace_text):
-        """Заменяет все вхождения текста по всем заметкам"""
-        self.collect_search_results(search_text)
-        if not self.search_results:
-            QMessageBox.information(self, TRANSLATIONS[self.current_language]['replace_title'],
-                                  TRANSLATIONS[self.current_language]['text_not_found'])
+        """Заменяет все вхождения текста по всем заметкам (одной транзакцией в базе данных)"""
+        tr = TRANSLATIONS[self.current_language]
+        # Несохранённые правки текущей заметки записываются до замены
+        self.save_current_note()
+        try:
+            counts = self.db.replace_all(search_text, replace_text, **self.text_search_options()).result()
+        except Exception as e:
+            QMessageBox.critical(self, tr['error_title'], tr['error_save_note'] + f": {str(e)}")
             return
-        # Сортируем результаты по note_id и индексу, чтобы заменять с конца
-        self.search_results.sort(key=lambda x: (x[0], -x[1]), reverse=True)
-        for note_id, start, end in self.search_results:
-            self.select_note_by_id(note_id)
-            content = self.editor.toPlainText()
-            new_content = content[:start] + replace_text + content[end:]
-            self.programmatic_load = True  # Устанавливаем флаг перед заменой
-            self.editor.setPlainText(new_content)
-            self.programmatic_load = False  # Сбрасываем флаг после замены
-            self.on_text_changed()  # Явно вызываем обработчик
-        QMessageBox.information(self, TRANSLATIONS[self.current_language]['replace_title'],
-                              TRANSLATIONS[self.current_language]['replace_count'] + str(len(self.search_results)))
+        if not counts:
+            QMessageBox.information(self, tr['replace_title'], tr['text_not_found'])
+            return
+        # Найденные ранее вхождения больше не соответствуют тексту заметок
+        self.search_results = []
+        self.undo_replace_all_action.setEnabled(True)
+        self.reload_current_note(counts)
+        QMessageBox.information(self, tr['replace_title'],
+                              tr['replace_count'] + str(sum(counts.values())) +
+                              "\n" + tr['replace_notes_count'] + str(len(counts)))
+
+    def undo_replace_all(self):
+        """Отмена последней замены всех вхождений"""
+        tr = TRANSLATIONS[self.current_language]
+        self.save_current_note()
+        try:
+            restored = self.db.undo_replace_all().result()
+        except Exception as e:
+            QMessageBox.critical(self, tr['error_title'], tr['error_save_note'] + f": {str(e)}")
+            return
+        self.undo_replace_all_action.setEnabled(False)
+        self.search_results = []
+        self.reload_current_note(restored)
+        QMessageBox.information(self, tr['replace_title'], tr['replace_undone'] + str(len(restored)))
+
+    def reload_current_note(self, changed_ids):
+        """Перечитывает текст текущей заметки в редактор, если она среди изменённых"""
+        if not self.current_note_id or self.current_note_id not in changed_ids:
+            return
+        note = self.db.get_note(self.current_note_id)
+        if not note:
+            return
+        position = self.editor.textCursor().position()
+        self.programmatic_load = True
+        self.editor.setPlainText(note['content'] or "")
+        self.programmatic_load = False
+        self.content_modified = False
+        cursor = self.editor.textCursor()
+        cursor.setPosition(min(position, len(note['content'] or "")))
+        self.editor.setTextCursor(cursor)
 
     def show_replace_all_dialog(self):
         """Показать диалог замены всех вхождений"""
@@ -1106,9 +1338,9 @@ class NotesApp(QMainWindow):
             search_text = dialog.search_edit.text()
             replace_text = dialog.replace_edit.text()
             if search_text:
+                self.search_options = dialog.search_options()
                 self.last_search_text = search_text
                 self.last_replace_text = replace_text
-                self.collect_search_results(search_text)
                 self.replace_all(search_text, replace_text)
 
     def get_all_notes(self):
@@ -1171,6 +1403,7 @@ class NotesApp(QMainWindow):
             self.db_manager.close_database()
             self.db_manager.init_database(new_db_path)
             self.db = self.db_manager.db
+            self.backup_scheduler.set_database(self.db.db_path)
             self.save_window_settings()
             self.load_notes()
 
@@ -1186,18 +1419,41 @@ class NotesApp(QMainWindow):
         self.db_manager.close_database()
         self.db_manager.init_database(db_path)
         self.db = self.db_manager.db
+        self.backup_scheduler.set_database(self.db.db_path)
         self.load_notes()
 
     def backup_db(self):
-        """Регулярный бэкап базы данных"""
-        backup_manager = BackupManager(BASE_DIR)
-        backup_manager.create_backup(self.db.db_path)
+        """
+        Регулярный бэкап базы данных (выполняется в фоновом потоке)
+        
+        Вызывается из меню и планировщиком бэкапов. Возвращает Future с путём к бэкапу
+        """
+        compact = Config().get('backup_compact', False)
+        future = self.backup_manager.start_backup(self.db.db_path, self.backup_progress.emit, compact)
+        if future is not self.backup_future:
+            # Новый бэкап (а не уже выполняющийся)
+            self.backup_future = future
+            future.add_done_callback(lambda done: self.backup_finished.emit(done.result()))
+        return future
+
+    def on_backup_progress(self, copied, total):
+        """Отображение хода бэкапа в строке состояния"""
+        percent = copied * 100 // total if total else 100
+        self.statusBar().showMessage(
+            TRANSLATIONS[self.current_language]['status_backup_progress'] + f"{percent}%")
+
+    def on_backup_finished(self, backup_path):
+        """Сообщение о завершении бэкапа"""
+        if backup_path:
+            self.statusBar().showMessage(
+                TRANSLATIONS[self.current_language]['status_backup_done'] + os.path.basename(backup_path), 5000)
+        else:
+            self.statusBar().showMessage(TRANSLATIONS[self.current_language]['status_backup_failed'], 5000)
 
     def restore_db(self):
         """Восстановление базы данных из бэкапа"""
-        backup_manager = BackupManager(BASE_DIR)
-        
-        if self.db_manager.restore_database(self, backup_manager):
+        if self.db_manager.restore_database(self, self.backup_manager):
+            self.db = self.db_manager.db
             # Сброс состояния и очистка интерфейса
             self.current_note_id = None
             self.current_parent_id = 1
@@ -1206,9 +1462,59 @@ class NotesApp(QMainWindow):
             self.last_search_text = ""
             self.last_replace_text = ""
             self.editor.clear()
-            self.tree.clear()
+            # База данных заменена целиком — дерево строится заново
             self.load_notes()
 
+    def restore_notes(self):
+        """Копирование отдельных заметок из бэкапа без замены базы данных"""
+        tr = TRANSLATIONS[self.current_language]
+        backup_path = self.db_manager.choose_backup(self, self.backup_manager, tr['action_restore_notes'])
+        if backup_path is not None:
+            self.browse_backup(backup_path)
+
+    def browse_backup(self, backup_path, note_id=None):
+        """
+        Просмотр заметок бэкапа с возможностью скопировать их в текущую базу
+        
+        Args:
+            backup_path (str): Путь к бэкапу
+            note_id (int, optional): ID заметки бэкапа, выбираемой при открытии
+        """
+        tr = TRANSLATIONS[self.current_language]
+        self.save_current_note()
+        copied_ids = []
+        try:
+            with self.backup_manager.open_backup(backup_path, private=True) as snapshot_path:
+                self.db.attach_backup(snapshot_path)
+                try:
+                    dialog = BackupBrowserDialog(self, self.db, snapshot_path)
+                    if note_id is not None:
+                        dialog.select_note(note_id)
+                    dialog.exec()
+                    copied_ids = dialog.copied_ids
+                finally:
+                    self.db.detach_backup()
+        except Exception as e:
+            QMessageBox.critical(self, tr['error_title'], tr['restore_notes_failed'] + f": {str(e)}")
+        
+        # Копии добавлены в конец списка заметок верхнего уровня
+        for note_id in copied_ids:
+            note = self.db.get_note(note_id, with_content=False)
+            if note:
+                self.tree_model.insert_note(note_id, 1, note['title'], len(self.db.get_notes(note_id)))
+        if copied_ids:
+            self.select_note_by_id(copied_ids[-1])
+
+    def show_backup_diff_dialog(self):
+        """Сравнение бэкапов между собой и с текущей базой данных"""
+        dialog = BackupDiffDialog(self)
+        dialog.exec()
+
+    def show_history_search_dialog(self):
+        """Поиск текста во всех бэкапах"""
+        dialog = HistorySearchDialog(self)
+        dialog.exec()
+
     def keyPressEvent(self, event):
         """Обработка нажатия клавиш"""
         if event.key() == Qt.Key.Key_Escape:
@@ -1218,88 +1524,89 @@ class NotesApp(QMainWindow):
         elif event.key() == Qt.Key.Key_Down and event.modifiers() == Qt.KeyboardModifier.ControlModifier:
             self.move_note_down()
         elif event.key() == Qt.Key.Key_F2:
-            current_item = self.tree.currentItem()
-            if current_item:
-                self.tree.editItem(current_item, 0)
+            current_index = self.tree.currentIndex()
+            if current_index.isValid():
+                self.tree.edit(current_index)
         else:
             super().keyPressEvent(event)
 
-    def on_item_changed(self, item, column):
-        """Обработка изменения элемента дерева"""
-        if not item or column != 0:
-            return
-            
-        note_id = item.data(0, Qt.ItemDataRole.UserRole)
-        if not note_id:
-            return
-            
-        new_title = item.text(0)
-        try:
-            # Получаем текущую заметку
-            note = self.db.get_note(note_id)
-            if note:
-                # Сохраняем с новым заголовком
-                self.db.save_note(note_id, new_title, note[2])
-        except Exception as e:
-            print(f"DEBUG: Ошибка при сохранении заголовка: {str(e)}")
-
-    def on_item_expanded(self, item):
-        """Сохраняем ID узла как раскрытый"""
-        note_id = item.data(0, Qt.ItemDataRole.UserRole)
+    def on_item_expanded(self, index):
+        """Подгружаем дочерние заметки и сохраняем ID узла как раскрытый"""
+        self.tree_model.fetch_children(index)
+        # Восстанавливаем раскрытие дочерних узлов, раскрытых в прошлый раз
+        self.restore_expanded(index)
+        
+        note_id = self.tree_model.note_id(index)
         if note_id:
             self.expanded_note_ids.add(int(note_id))
             self.save_window_settings()
 
-    def on_item_collapsed(self, item):
+    def on_item_collapsed(self, index):
         """Удаляем ID узла из раскрытых"""
-        note_id = item.data(0, Qt.ItemDataRole.UserRole)
+        note_id = self.tree_model.note_id(index)
         if note_id and int(note_id) in self.expanded_note_ids:
             self.expanded_note_ids.remove(int(note_id))
             self.save_window_settings()
 
     def move_note_up(self):
         """Переместить заметку вверх среди соседей"""
-        item = self.tree.currentItem()
-        if not item:
+        current_index = self.tree.currentIndex()
+        if not current_index.isValid():
             return
-        parent = item.parent() or self.tree.invisibleRootItem()
-        index = parent.indexOfChild(item)
+        index = current_index.row()
         if index > 0:
-            # Получаем ID заметок для обновления порядка
-            current_id = item.data(0, Qt.ItemDataRole.UserRole)
-            prev_item = parent.child(index - 1)
-            prev_id = prev_item.data(0, Qt.ItemDataRole.UserRole)
-            
-            # Обновляем порядок в базе данных
-            self.db.update_note_order(current_id, index - 1)
-            self.db.update_note_order(prev_id, index)
-            
-            # Обновляем отображение
-            parent.takeChild(index)
-            parent.insertChild(index - 1, item)
-            self.tree.setCurrentItem(item)
+            # В базу записывается только новый порядок текущей заметки
+            current_id = self.tree_model.note_id(current_index)
+            self.tree_model.reorder_note(current_id, index - 1)
+            self.tree.setCurrentIndex(self.tree_model.index_for_note(current_id))
 
     def move_note_down(self):
         """Переместить заметку вниз среди соседей"""
-        item = self.tree.currentItem()
-        if not item:
+        current_index = self.tree.currentIndex()
+        if not current_index.isValid():
             return
-        parent = item.parent() or self.tree.invisibleRootItem()
-        index = parent.indexOfChild(item)
-        if 0 <= index < parent.childCount() - 1:
-            # Получаем ID заметок для обновления порядка
-            current_id = item.data(0, Qt.ItemDataRole.UserRole)
-            next_item = parent.child(index + 1)
-            next_id = next_item.data(0, Qt.ItemDataRole.UserRole)
-            
-            # Обновляем порядок в базе данных
-            self.db.update_note_order(current_id, index + 1)
-            self.db.update_note_order(next_id, index)
-            
-            # Обновляем отображение
-            parent.takeChild(index)
-            parent.insertChild(index + 1, item)
-            self.tree.setCurrentItem(item)
+        index = current_index.row()
+        if 0 <= index < self.tree_model.rowCount(current_index.parent()) - 1:
+            # В базу записывается только новый порядок текущей заметки
+            current_id = self.tree_model.note_id(current_index)
+            self.tree_model.reorder_note(current_id, index + 1)
+            self.tree.setCurrentIndex(self.tree_model.index_for_note(current_id))
+
+    def cut_note(self):
+        """Вырезать заметку для переноса (заметка остаётся на месте до вставки)"""
+        note_id = self.current_tree_note_id()
+        if not note_id:
+            return
+        self.cut_note_id = note_id
+        self.statusBar().showMessage(
+            TRANSLATIONS[self.current_language]['status_note_cut'] + self.tree_model.nodes[note_id].title, 5000)
+
+    def paste_note(self):
+        """Вставить вырезанную заметку последней вложенной заметкой в выбранную (или на верхний уровень)"""
+        note_id = self.cut_note_id
+        if note_id is None or not self.tree_model.index_for_note(note_id, load=True).isValid():
+            # Вырезанная заметка уже удалена
+            self.cut_note_id = None
+            return
+        target_index = self.tree.currentIndex()
+        target_id = self.tree_model.note_id(target_index) or 1
+        if not self.tree_model.can_move(note_id, target_id):
+            QMessageBox.warning(self, TRANSLATIONS[self.current_language]['warning_title'],
+                              TRANSLATIONS[self.current_language]['cannot_move_into_child'])
+            return
+        # Загружаем ветку нового родителя, чтобы заметка перенеслась вместе с раскрытым поддеревом
+        self.tree_model.fetch_children(target_index)
+        if self.tree_model.move_subtree(note_id, target_id):
+            self.cut_note_id = None
+            if target_index.isValid():
+                self.tree.expand(target_index)
+            self.select_note_by_id(note_id)
+
+    def on_notes_moved(self, parent, start, end, destination, row):
+        """Обновление родителя текущей заметки после её переноса в другую ветку"""
+        node = self.tree_model.nodes.get(self.current_note_id)
+        if node is not None and node.parent is not None:
+            self.current_parent_id = node.parent.note_id
 
     def on_title_changed(self):
         """Обработчик изменения заголовка"""
@@ -1307,12 +1614,12 @@ class NotesApp(QMainWindow):
             return
             
         # Обновляем заголовок в дереве
-        current_item = self.tree.currentItem()
-        if current_item:
-            current_item.setText(0, self.title_input.text())
+        current_index = self.tree.currentIndex()
+        if current_index.isValid():
+            self.tree_model.setData(current_index, self.title_input.text())
             self.content_modified = True
-            # Сохраняем изменения в базу данных
-            self.save_current_note()
+            # Сохранение откладывается до паузы в редактировании
+            self.schedule_autosave()
 
     def save_window_settings(self):
         try:
@@ -1348,6 +1655,12 @@ class NotesApp(QMainWindow):
                 config.add_section('Tree')
             config['Tree']['expanded_ids'] = ','.join(str(i) for i in sorted(self.expanded_note_ids))
 
+            # Сохраняем настройки автосохранения (секция main читается через Config)
+            if not config.has_section('main'):
+                config.add_section('main')
+            config['main']['auto_save'] = str(self.auto_save)
+            config['main']['save_interval'] = str(self.save_interval)
+            
             # Сохраняем настройки шрифта
             if not config.has_section('Font'):
                 config.add_section('Font')
@@ -1377,7 +1690,7 @@ class NotesApp(QMainWindow):
         """Обработка изменения текущего элемента дерева"""
         # Этот обработчик нужен для корректной работы с клавиатурой
         # но мы не хотим, чтобы он вызывал сохранение при программном изменении
-        if current and not self.programmatic_load:
+        if current.isValid() and not self.programmatic_load:
             # Только если это не программное изменение
             self.on_note_selected(current)
 
@@ -1398,4 +1711,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == '__main__':
+    # Поиск по бэкапам использует пул процессов (нужно для запуска из exe)
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file
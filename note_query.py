@@ -0,0 +1,178 @@
+import json
+import re
+from datetime import date, timedelta
+
+
+class QueryTerm:
+    """Условие поискового запроса"""
+    __slots__ = ('field', 'value', 'negated')
+
+    def __init__(self, field, value, negated=False):
+        # field: None — текст заметки, 'title', 'in', 'modified', 'created'
+        self.field = field
+        self.value = value
+        self.negated = negated
+
+    def __repr__(self):
+        return f"QueryTerm({self.field!r}, {self.value!r}, negated={self.negated})"
+
+
+FIELDS = ('title', 'in', 'modified', 'created')
+DATE_COLUMNS = {'modified': 'updated_at', 'created': 'created_at'}
+
+# [-][поле:]("фраза" | слово); кавычки внутри фразы удваиваются
+TOKEN_RE = re.compile(r'(-?)(?:(\w+):)?(?:"((?:[^"]|"")*)"?|(\S+))')
+DATE_RE = re.compile(r'(>=|<=|>|<|=)?(\d{4}-\d{2}-\d{2})$')
+
+
+def parse_query(text):
+    """
+    Разбор поискового запроса
+
+    Синтаксис: слова и "фразы" ищутся в тексте заметки, title:слово — в
+    заголовке, in:"Папка/Подпапка" ограничивает поиск веткой дерева,
+    modified:>2026-01-01 и created:<=2026-02-01 — по датам (также >=, <, =
+    или просто дата). Минус перед условием исключает подходящие заметки.
+    Регистр не учитывается.
+
+    Args:
+        text (str): Текст запроса
+
+    Returns:
+        list: Условия QueryTerm. Неверное условие вызывает ValueError
+    """
+    terms = []
+    for match in TOKEN_RE.finditer(text):
+        negated, field, phrase, word = match.groups()
+        value = phrase.replace('""', '"') if phrase is not None else word
+        if field is not None and field.lower() not in FIELDS:
+            # Неизвестное поле — обычный текст вместе с двоеточием
+            value = f"{field}:{value}"
+            field = None
+        elif field is not None:
+            field = field.lower()
+        if not value:
+            if field is not None:
+                raise ValueError(f"Пустое условие {field}:")
+            continue
+        if field in DATE_COLUMNS and not valid_date(value):
+            raise ValueError(f"Неверная дата в условии {field}:{value} (ожидается ГГГГ-ММ-ДД)")
+        terms.append(QueryTerm(field, value, bool(negated)))
+    return terms
+
+
+def valid_date(value):
+    """Условие по дате вида [>|>=|<|<=|=]ГГГГ-ММ-ДД с существующей датой"""
+    match = DATE_RE.match(value)
+    if match is None:
+        return False
+    try:
+        date.fromisoformat(match.group(2))
+    except ValueError:
+        return False
+    return True
+
+
+def date_condition(column, value):
+    """Условие SQL по дате: (SQL, параметры)"""
+    operator, day = DATE_RE.match(value).groups()
+    day = date.fromisoformat(day)
+    next_day = (day + timedelta(days=1)).isoformat()
+    day = day.isoformat()
+    # Даты хранятся строками 'ГГГГ-ММ-ДД ЧЧ:ММ:СС', поэтому сравниваются с границами суток
+    if operator == '>':
+        return f"n.{column} >= ?", [next_day]
+    if operator == '>=':
+        return f"n.{column} >= ?", [day]
+    if operator == '<':
+        return f"n.{column} < ?", [day]
+    if operator == '<=':
+        return f"n.{column} < ?", [next_day]
+    return f"(n.{column} >= ? AND n.{column} < ?)", [day, next_day]
+
+
+def compile_query(terms, fts_enabled=False):
+    """
+    Компиляция условий запроса в один SQL-запрос
+
+    Текст ищется по полнотекстовому индексу (фразы от трёх символов), ветка
+    дерева для in: находится рекурсивным CTE по заголовкам пути и затем
+    обходится рекурсивным CTE вниз, даты сравниваются по индексированным
+    столбцам. Для сравнения без учёта регистра соединение должно иметь
+    функцию casefold (см. NotesDB.reader).
+
+    Returns:
+        tuple: (SQL, параметры) — выбираются id, title, parent_id и content
+    """
+    ctes = []
+    cte_params = []
+    conditions = []
+    params = []
+
+    # Фразы для индекса объединяются в один запрос MATCH
+    indexed = [term for term in terms if term.field is None and not term.negated
+               and fts_enabled and len(term.value) >= 3]
+    if indexed:
+        conditions.append("n.id IN (SELECT rowid FROM notes_fts WHERE notes_fts MATCH ?)")
+        params.append(' AND '.join(fts_phrase(term.value) for term in indexed))
+
+    for term in terms:
+        if term in indexed:
+            continue
+        if term.field is None:
+            if fts_enabled and len(term.value) >= 3:
+                condition = "n.id IN (SELECT rowid FROM notes_fts WHERE notes_fts MATCH ?)"
+                term_params = [fts_phrase(term.value)]
+            else:
+                condition = "instr(casefold(b.content), ?) > 0"
+                term_params = [term.value.casefold()]
+        elif term.field == 'title':
+            condition = "instr(casefold(n.title), ?) > 0"
+            term_params = [term.value.casefold()]
+        elif term.field == 'in':
+            # Заметка по пути заголовков от верхнего уровня, затем всё её поддерево
+            number = len(ctes) // 2 + 1
+            components = [part.strip().casefold() for part in term.value.split('/') if part.strip()]
+            ctes.append(f'''
+                scope_path{number}(level, id) AS (
+                    SELECT 0, 1
+                    UNION ALL
+                    SELECT p.level + 1, n.id FROM scope_path{number} p
+                    JOIN json_each(?) c ON c.key = p.level
+                    JOIN notes n ON n.parent_id = p.id AND casefold(n.title) = c.value
+                )''')
+            ctes.append(f'''
+                scope{number}(id) AS (
+                    SELECT id FROM scope_path{number} WHERE level = ? AND level > 0
+                    UNION
+                    SELECT n.id FROM notes n JOIN scope{number} s ON n.parent_id = s.id
+                )''')
+            cte_params.extend([json.dumps(components, ensure_ascii=False), len(components)])
+            condition = f"n.id IN (SELECT id FROM scope{number})"
+            term_params = []
+        else:
+            condition, term_params = date_condition(DATE_COLUMNS[term.field], term.value)
+        conditions.append(f"NOT ({condition})" if term.negated else condition)
+        params.extend(term_params)
+
+    sql = ''
+    if ctes:
+        sql = 'WITH RECURSIVE' + ','.join(ctes) + '\n'
+    sql += '''
+        SELECT n.id, n.title, n.parent_id, b.content
+        FROM notes n LEFT JOIN note_bodies b ON b.note_id = n.id
+        WHERE n.id != 1'''
+    for condition in conditions:
+        sql += '\n          AND ' + condition
+    sql += '\n        ORDER BY n.order_index, n.id'
+    return sql, cte_params + params
+
+
+def fts_phrase(text):
+    """Фраза для запроса MATCH полнотекстового индекса"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def highlight_terms(terms):
+    """Фразы, вхождения которых выделяются в тексте найденных заметок"""
+    return [term.value for term in terms if term.field is None and not term.negated]
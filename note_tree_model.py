@@ -0,0 +1,394 @@
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex, QMimeData
+
+
+class NoteNode:
+    """Компактная запись об узле дерева заметок (без содержимого заметки)"""
+    __slots__ = ('note_id', 'title', 'parent', 'row', 'children', 'child_count')
+
+    def __init__(self, note_id, title, parent=None, row=0, child_count=0):
+        self.note_id = note_id
+        self.title = title
+        self.parent = parent
+        self.row = row
+        # None — дочерние узлы ещё не загружены из базы
+        self.children = None
+        self.child_count = child_count
+
+
+class NoteTreeModel(QAbstractItemModel):
+    """
+    Модель дерева заметок поверх NotesDB с ленивой подгрузкой веток
+
+    Узлы загружаются по одному уровню через canFetchMore/fetchMore,
+    поэтому в памяти находятся только раскрытые ветки. Модель над схемой,
+    отличной от 'main' (подключённым бэкапом), доступна только для чтения.
+    """
+
+    def __init__(self, db=None, parent=None, schema='main'):
+        super().__init__(parent)
+        self.db = db
+        self.schema = schema
+        self.root = NoteNode(1, '')
+        # Индекс загруженных узлов: note_id -> NoteNode
+        self.nodes = {1: self.root}
+
+    def set_database(self, db):
+        """Смена базы данных и полная перезагрузка модели"""
+        self.db = db
+        self.reload()
+
+    def reload(self):
+        """Перезагрузка модели: сбрасывает все узлы и заново читает верхний уровень"""
+        self.beginResetModel()
+        self.root = NoteNode(1, '')
+        self.nodes = {1: self.root}
+        if self.db is not None:
+            self.root.children = self.load_nodes(self.root)
+        self.endResetModel()
+
+    def load_nodes(self, parent_node):
+        """Чтение дочерних узлов из базы данных (только заголовки и число потомков)"""
+        children = []
+        for row, note in enumerate(self.db.get_notes(parent_node.note_id, schema=self.schema)):
+            node = NoteNode(note['id'], note['title'], parent_node, row, note['child_count'])
+            self.nodes[node.note_id] = node
+            children.append(node)
+        return children
+
+    # --- Навигация по модели ---
+
+    def node_from_index(self, index):
+        """Получение узла по индексу модели (корень для недействительного индекса)"""
+        if index.isValid():
+            return index.internalPointer()
+        return self.root
+
+    def index_for_node(self, node):
+        """Получение индекса модели для узла"""
+        if node is None or node is self.root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def note_id(self, index):
+        """ID заметки по индексу модели"""
+        if not index.isValid():
+            return None
+        return index.internalPointer().note_id
+
+    def index_for_note(self, note_id, load=False):
+        """
+        Получение индекса модели по ID заметки
+
+        Args:
+            note_id (int): ID заметки
+            load (bool): Подгрузить ветки, ведущие к заметке, если она ещё не загружена
+        """
+        node = self.nodes.get(note_id)
+        if node is None and load and self.db is not None:
+            for path_id in self.db.get_note_path(note_id, schema=self.schema):
+                path_node = self.nodes.get(path_id)
+                if path_node is None:
+                    break
+                if path_id != note_id:
+                    self.fetch_children(self.index_for_node(path_node))
+            node = self.nodes.get(note_id)
+        if node is None or node is self.root:
+            return QModelIndex()
+        return self.index_for_node(node)
+
+    # --- Интерфейс QAbstractItemModel ---
+
+    def index(self, row, column, parent=QModelIndex()):
+        parent_node = self.node_from_index(parent)
+        if column != 0 or parent_node.children is None:
+            return QModelIndex()
+        if 0 <= row < len(parent_node.children):
+            return self.createIndex(row, 0, parent_node.children[row])
+        return QModelIndex()
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        return self.index_for_node(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        children = self.node_from_index(parent).children
+        return len(children) if children is not None else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node_from_index(parent)
+        if node.children is None:
+            return node.child_count > 0
+        return len(node.children) > 0
+
+    def canFetchMore(self, parent):
+        node = self.node_from_index(parent)
+        return node.children is None and self.db is not None
+
+    def fetchMore(self, parent):
+        node = self.node_from_index(parent)
+        if node.children is not None or self.db is None:
+            return
+        children = self.load_nodes(node)
+        if not children:
+            node.children = []
+            node.child_count = 0
+            return
+        self.beginInsertRows(parent, 0, len(children) - 1)
+        node.children = children
+        node.child_count = len(children)
+        self.endInsertRows()
+
+    def fetch_children(self, index):
+        """Гарантированная подгрузка дочерних узлов (без раскрытия ветки в представлении)"""
+        if self.canFetchMore(index):
+            self.fetchMore(index)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return node.title
+        if role == Qt.ItemDataRole.UserRole:
+            return node.note_id
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            # Перетаскивание на свободное место — в список верхнего уровня
+            if self.schema != 'main':
+                return Qt.ItemFlag.NoItemFlags
+            return Qt.ItemFlag.ItemIsDropEnabled
+        if self.schema != 'main':
+            return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        return (Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable |
+                Qt.ItemFlag.ItemIsEditable | Qt.ItemFlag.ItemIsDragEnabled |
+                Qt.ItemFlag.ItemIsDropEnabled)
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        """Переименование заметки: в базу пишется только действительно изменённый заголовок"""
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole or self.schema != 'main':
+            return False
+        node = index.internalPointer()
+        new_title = str(value)
+        if new_title == node.title:
+            return False
+        try:
+            self.db.update_title(node.note_id, new_title)
+        except Exception as e:
+            print(f"DEBUG: Ошибка при сохранении заголовка: {str(e)}")
+            return False
+        node.title = new_title
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole])
+        return True
+
+    # --- Перетаскивание ---
+
+    MIME_TYPE = 'application/x-skimnote-note-id'
+
+    def supportedDragActions(self):
+        return Qt.DropAction.MoveAction
+
+    def supportedDropActions(self):
+        return Qt.DropAction.MoveAction
+
+    def mimeTypes(self):
+        return [self.MIME_TYPE]
+
+    def mimeData(self, indexes):
+        note_ids = [str(self.note_id(index)) for index in indexes if index.isValid()]
+        if not note_ids:
+            return None
+        data = QMimeData()
+        data.setData(self.MIME_TYPE, ','.join(note_ids).encode())
+        return data
+
+    def dropped_note_id(self, data):
+        """ID перетаскиваемой заметки из данных перетаскивания (None, если это не заметка)"""
+        if not data.hasFormat(self.MIME_TYPE):
+            return None
+        try:
+            return int(bytes(data.data(self.MIME_TYPE)).decode().split(',')[0])
+        except ValueError:
+            return None
+
+    def canDropMimeData(self, data, action, row, column, parent):
+        if action != Qt.DropAction.MoveAction or self.schema != 'main':
+            return False
+        note_id = self.dropped_note_id(data)
+        return note_id is not None and self.can_move(note_id, self.node_from_index(parent).note_id)
+
+    def dropMimeData(self, data, action, row, column, parent):
+        """
+        Перемещение перетащенной заметки
+
+        Бросок между заметками ставит её на эту позицию (в том числе в другой
+        ветке), бросок на заметку делает её последней вложенной заметкой.
+        """
+        if not self.canDropMimeData(data, action, row, column, parent):
+            return False
+        note_id = self.dropped_note_id(data)
+        node = self.nodes.get(note_id)
+        parent_node = self.node_from_index(parent)
+        if parent_node is node.parent and row >= 0:
+            # row — позиция вставки до удаления строки со старого места
+            new_row = row - 1 if row > node.row else row
+            return self.reorder_note(note_id, new_row)
+        return self.move_subtree(note_id, parent_node.note_id, row if row >= 0 else None)
+
+    # --- Точечные изменения структуры ---
+
+    def insert_note(self, note_id, parent_id, title, child_count=0):
+        """Добавление узла только что созданной (или скопированной) заметки в конец списка родителя"""
+        parent_node = self.nodes.get(parent_id)
+        if parent_node is None:
+            # Родитель не загружен — заметка появится при подгрузке его ветки
+            return QModelIndex()
+        parent_index = self.index_for_node(parent_node)
+        if parent_node.children is None:
+            # Ветка ещё не загружена — читаем её из базы вместе с новой заметкой
+            parent_node.child_count += 1
+            self.fetch_children(parent_index)
+            return self.index_for_note(note_id)
+
+        row = len(parent_node.children)
+        self.beginInsertRows(parent_index, row, row)
+        node = NoteNode(note_id, title, parent_node, row, child_count)
+        parent_node.children.append(node)
+        parent_node.child_count = len(parent_node.children)
+        self.nodes[note_id] = node
+        self.endInsertRows()
+        return self.index_for_node(node)
+
+    def remove_note(self, note_id):
+        """Удаление узла заметки вместе с загруженным поддеревом"""
+        node = self.nodes.get(note_id)
+        if node is None or node is self.root:
+            return
+        parent_node = node.parent
+        self.beginRemoveRows(self.index_for_node(parent_node), node.row, node.row)
+        del parent_node.children[node.row]
+        self.renumber(parent_node, node.row)
+        parent_node.child_count = len(parent_node.children)
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            self.nodes.pop(current.note_id, None)
+            if current.children:
+                stack.extend(current.children)
+        self.endRemoveRows()
+
+    def move_note(self, note_id, new_row):
+        """Перемещение узла на другую позицию среди соседей"""
+        node = self.nodes.get(note_id)
+        if node is None or node is self.root:
+            return False
+        siblings = node.parent.children
+        old_row = node.row
+        if new_row == old_row or not 0 <= new_row < len(siblings):
+            return False
+        parent_index = self.index_for_node(node.parent)
+        # beginMoveRows ожидает позицию вставки до удаления строки из старого места
+        destination = new_row + 1 if new_row > old_row else new_row
+        if not self.beginMoveRows(parent_index, old_row, old_row, parent_index, destination):
+            return False
+        siblings.insert(new_row, siblings.pop(old_row))
+        self.renumber(node.parent, min(old_row, new_row))
+        self.endMoveRows()
+        return True
+
+    def reorder_note(self, note_id, new_row):
+        """
+        Перемещение заметки среди соседей в модели и в базе данных
+
+        В базу записывается только порядок самой заметки — между её новыми соседями.
+        """
+        node = self.nodes.get(note_id)
+        if node is None or node is self.root or self.schema != 'main':
+            return False
+        siblings = [child for child in node.parent.children if child is not node]
+        if new_row == node.row or not 0 <= new_row <= len(siblings):
+            return False
+        prev_id = siblings[new_row - 1].note_id if new_row > 0 else None
+        next_id = siblings[new_row].note_id if new_row < len(siblings) else None
+        try:
+            self.db.move_note_to(note_id, prev_id, next_id)
+        except Exception as e:
+            print(f"DEBUG: Ошибка при перемещении заметки: {str(e)}")
+            return False
+        return self.move_note(note_id, new_row)
+
+    def can_move(self, note_id, new_parent_id):
+        """Можно ли перенести заметку к новому родителю (не в саму себя и не в своё поддерево)"""
+        node = self.nodes.get(note_id)
+        target = self.nodes.get(new_parent_id)
+        if node is None or node is self.root or target is None:
+            return False
+        # Все предки загруженного узла тоже загружены, поэтому проверка по модели точна
+        while target is not None:
+            if target is node:
+                return False
+            target = target.parent
+        return True
+
+    def move_subtree(self, note_id, new_parent_id, position=None):
+        """
+        Перенос заметки с поддеревом к другому родителю в модели и в базе данных
+
+        Args:
+            note_id (int): ID переносимой заметки
+            new_parent_id (int): ID нового родителя
+            position (int): Позиция среди дочерних узлов нового родителя (None — в конец)
+        """
+        if self.schema != 'main' or not self.can_move(note_id, new_parent_id):
+            return False
+        node = self.nodes[note_id]
+        new_parent = self.nodes[new_parent_id]
+        if new_parent is node.parent:
+            siblings = len(new_parent.children) - 1
+            new_row = siblings if position is None else min(position, siblings)
+            # Заметка уже на нужном месте — перенос выполнен без изменений
+            return new_row == node.row or self.reorder_note(note_id, new_row)
+        try:
+            # Ожидаем записи: она меняет одну строку, а ветку нового родителя
+            # после этого можно сразу читать из базы
+            self.db.move_subtree(note_id, new_parent_id, position).result()
+        except Exception as e:
+            print(f"DEBUG: Ошибка при переносе заметки: {str(e)}")
+            return False
+
+        old_parent = node.parent
+        old_index = self.index_for_node(old_parent)
+        new_index = self.index_for_node(new_parent)
+        if new_parent.children is None:
+            # Ветка нового родителя не загружена — узел появится при её подгрузке
+            self.remove_note(note_id)
+            new_parent.child_count += 1
+            # Обновляем признак наличия дочерних заметок у нового родителя
+            self.dataChanged.emit(new_index, new_index)
+            return True
+
+        # Узел переносится вместе с загруженным поддеревом, индексы в представлении сохраняются
+        row = len(new_parent.children) if position is None else max(0, min(position, len(new_parent.children)))
+        if not self.beginMoveRows(old_index, node.row, node.row, new_index, row):
+            return False
+        del old_parent.children[node.row]
+        self.renumber(old_parent, node.row)
+        old_parent.child_count = len(old_parent.children)
+        new_parent.children.insert(row, node)
+        node.parent = new_parent
+        self.renumber(new_parent, row)
+        new_parent.child_count = len(new_parent.children)
+        self.endMoveRows()
+        return True
+
+    def renumber(self, parent_node, start=0):
+        """Обновление номеров строк дочерних узлов начиная с позиции start"""
+        for row in range(start, len(parent_node.children)):
+            parent_node.children[row].row = row
@@ -0,0 +1,146 @@
+from PyQt6.QtWidgets import (QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+                             QPushButton, QLineEdit, QTreeWidget, QTreeWidgetItem)
+from PyQt6.QtCore import Qt, pyqtSignal
+from translations import TRANSLATIONS
+
+
+class SearchPanel(QDockWidget):
+    """
+    Панель результатов поиска по заметкам
+
+    Поиск выполняется в фоновом потоке (NotesDB.search_async), вхождения
+    появляются в списке по мере нахождения. Новый поиск отменяет предыдущий.
+    Щелчок по вхождению открывает заметку с выделенным совпадением.
+    """
+
+    # Вхождения и завершение поиска (из потока поиска): ID запроса, данные
+    hits_found = pyqtSignal(int, list)
+    search_finished = pyqtSignal(int, bool)
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.main_window = parent
+        self.setObjectName('search_panel')
+        # ID выполняющегося запроса; вхождения других запросов отбрасываются
+        self.query_id = None
+        self.hit_count = 0
+        self.hits_found.connect(self.on_hits_found)
+        self.search_finished.connect(self.on_search_finished)
+        self.setup_ui()
+        self.update_language()
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setContentsMargins(4, 4, 4, 4)
+
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.returnPressed.connect(self.request_search)
+        self.search_button = QPushButton()
+        self.search_button.clicked.connect(self.request_search)
+        self.stop_button = QPushButton()
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self.stop_search)
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.search_button)
+        search_layout.addWidget(self.stop_button)
+        layout.addLayout(search_layout)
+
+        self.results = QTreeWidget()
+        self.results.setRootIsDecorated(False)
+        self.results.setUniformRowHeights(True)
+        self.results.setColumnWidth(0, 160)
+        self.results.setColumnWidth(1, 200)
+        self.results.itemClicked.connect(self.open_hit)
+        self.results.itemActivated.connect(self.open_hit)
+        layout.addWidget(self.results)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.setWidget(widget)
+
+    def update_language(self):
+        """Обновление надписей после смены языка"""
+        tr = TRANSLATIONS[self.main_window.current_language]
+        self.setWindowTitle(tr['search_panel_title'])
+        self.search_button.setText(tr['history_search'])
+        self.stop_button.setText(tr['history_stop'])
+        self.results.setHeaderLabels([tr['search_col_note'], tr['search_col_path'], tr['history_col_text']])
+
+    def request_search(self):
+        """
+        Поиск текста из поля ввода панели
+        
+        Выполняется через главное окно (NotesApp.start_background_search), которое
+        проверяет запрос и сбрасывает результаты предыдущего поиска для F3.
+        """
+        self.main_window.start_background_search(self.search_input.text(), jump=False)
+
+    def start_search(self, text):
+        """Запуск поиска (вызывается из NotesApp.start_background_search). Предыдущий поиск отменяется"""
+        self.search_input.setText(text)
+        db = self.main_window.db
+        if not text or db is None:
+            return
+        self.show()
+        self.results.clear()
+        self.hit_count = 0
+        self.query_id = db.search_async(text, self.hits_found.emit, self.search_finished.emit,
+                                        **self.main_window.search_options)
+        self.stop_button.setEnabled(True)
+        self.status_label.setText(TRANSLATIONS[self.main_window.current_language]['history_searching'] + "0")
+
+    def show_error(self, message):
+        """Остановка поиска и показ ошибки (например, в регулярном выражении)"""
+        self.show()
+        self.stop_search()
+        self.results.clear()
+        self.hit_count = 0
+        self.status_label.setText(message)
+
+    def stop_search(self):
+        """Остановка выполняющегося поиска"""
+        if self.query_id is None:
+            return
+        if self.main_window.db is not None:
+            self.main_window.db.cancel_search()
+        self.query_id = None
+        self.stop_button.setEnabled(False)
+        self.status_label.setText(
+            TRANSLATIONS[self.main_window.current_language]['history_stopped'] + str(self.hit_count))
+
+    def on_hits_found(self, query_id, hits):
+        """Добавление очередной части вхождений"""
+        if query_id != self.query_id:
+            return
+        items = []
+        for note_id, title, path, start, end, snippet in hits:
+            item = QTreeWidgetItem([title, path, snippet])
+            item.setData(0, Qt.ItemDataRole.UserRole, (note_id, start, end))
+            items.append(item)
+        self.results.addTopLevelItems(items)
+        self.hit_count += len(hits)
+        self.status_label.setText(
+            TRANSLATIONS[self.main_window.current_language]['history_searching'] + str(self.hit_count))
+        self.main_window.on_search_hits([(note_id, start, end) for note_id, title, path, start, end, snippet in hits])
+
+    def on_search_finished(self, query_id, completed):
+        """Завершение поиска"""
+        if query_id != self.query_id:
+            return
+        self.query_id = None
+        self.stop_button.setEnabled(False)
+        tr = TRANSLATIONS[self.main_window.current_language]
+        if completed and not self.hit_count:
+            self.status_label.setText(tr['text_not_found'])
+        elif completed:
+            self.status_label.setText(tr['history_found'] + str(self.hit_count))
+        else:
+            self.status_label.setText(tr['history_stopped'] + str(self.hit_count))
+
+    def open_hit(self, item, column=0):
+        """Открытие заметки с выделенным вхождением"""
+        note_id, start, end = item.data(0, Qt.ItemDataRole.UserRole)
+        self.main_window.open_search_hit(note_id, start, end)
@@ -1,5 +1,6 @@
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
-                            QPushButton, QComboBox, QSpinBox, QLineEdit, QFileDialog)
+                            QPushButton, QComboBox, QSpinBox, QLineEdit, QFileDialog,
+                            QCheckBox)
 from PyQt6.QtCore import Qt
 from config import Config
 from translations import TRANSLATIONS
@@ -46,6 +47,19 @@ class SettingsDialog(QDialog):
         font_layout.addWidget(self.font_size_spin)
         layout.addLayout(font_layout)
         
+        # Автосохранение
+        self.auto_save_check = QCheckBox(TRANSLATIONS[self.current_language]['settings_auto_save'])
+        layout.addWidget(self.auto_save_check)
+        
+        interval_layout = QHBoxLayout()
+        interval_label = QLabel(TRANSLATIONS[self.current_language]['settings_save_interval'])
+        self.save_interval_spin = QSpinBox()
+        self.save_interval_spin.setRange(1, 600)
+        self.auto_save_check.toggled.connect(self.save_interval_spin.setEnabled)
+        interval_layout.addWidget(interval_label)
+        interval_layout.addWidget(self.save_interval_spin)
+        layout.addLayout(interval_layout)
+        
         # Кнопки
         button_layout = QHBoxLayout()
         ok_button = QPushButton(TRANSLATIONS[self.current_language]['settings_save'])
@@ -72,11 +86,16 @@ class SettingsDialog(QDialog):
         self.lang_combo.setCurrentText(self.main_window.current_language)
         self.db_path_edit.setText(self.main_window.db.db_path)
         self.font_size_spin.setValue(self.main_window.font_size)
+        self.auto_save_check.setChecked(self.main_window.auto_save)
+        self.save_interval_spin.setValue(self.main_window.save_interval)
+        self.save_interval_spin.setEnabled(self.main_window.auto_save)
         
     def get_settings(self):
         """Возвращает выбранные настройки"""
         return {
             'language': self.lang_combo.currentText(),
             'db_path': self.db_path_edit.text(),
-            'font_size': self.font_size_spin.value()
+            'font_size': self.font_size_spin.value(),
+            'auto_save': self.auto_save_check.isChecked(),
+            'save_interval': self.save_interval_spin.value()
         } 
\ No newline at end of file
@@ -23,8 +23,12 @@ TRANSLATIONS = {
         'action_replace_all': 'Заменить все',
         'action_move_up': 'Переместить вверх',
         'action_move_down': 'Переместить вниз',
+        'action_cut_note': 'Вырезать заметку',
+        'action_paste_note': 'Вставить заметку',
         'action_change_db': 'Сменить базу данных',
         'action_restore_db': 'Восстановление базы данных',
+        'action_backup_db': 'Создать бэкап',
+        'action_restore_notes': 'Восстановить заметки из бэкапа',
         'action_theme': 'Тема',
         'action_font': 'Шрифт',
         'settings_title': 'Настройки',
@@ -94,17 +98,69 @@ TRANSLATIONS = {
         'error_restore': 'Не удалось восстановить базу данных',
         'error_save_settings': 'Не удалось сохранить настройки',
         'cannot_delete_root': 'Нельзя удалить корневую заметку',
+        'cannot_move_into_child': 'Нельзя переместить заметку внутрь неё самой',
+        'status_note_cut': 'Вырезана заметка: ',
         'confirm_delete': 'Вы уверены, что хотите удалить эту заметку?',
         'confirm_delete_with_children': 'У этой заметки есть подзаметки. Они также будут удалены.',
         'confirm_restore': 'Текущая база данных будет удалена. Продолжать восстановление?',
         'no_search_results': 'Нет результатов поиска',
         'text_not_found': 'Текст не найден',
         'replace_count': 'Заменено вхождений: ',
+        'replace_notes_count': 'Изменено заметок: ',
+        'replace_undone': 'Замена отменена, восстановлено заметок: ',
+        'action_undo_replace_all': 'Отменить замену всех',
         'backup_dir_not_found': 'Папка с бэкапами не найдена',
         'no_backups_found': 'Бэкапы не найдены',
+        'backup_note_count': 'заметок: ',
+        'backup_size_mb': 'МБ',
+        'backup_damaged': 'повреждён',
+        'restore_notes_copy': 'Копировать в базу',
+        'restore_notes_with_children': 'Вместе с вложенными заметками',
+        'restore_notes_close': 'Закрыть',
+        'restore_notes_done': 'Скопировано: ',
+        'restore_notes_failed': 'Не удалось скопировать заметки из бэкапа',
+        'action_history_search': 'Поиск в бэкапах',
+        'history_search': 'Найти',
+        'history_stop': 'Остановить',
+        'history_col_backup': 'Бэкап',
+        'history_col_note': 'Заметка',
+        'history_col_text': 'Текст',
+        'history_searching': 'Поиск... найдено: ',
+        'history_found': 'Найдено: ',
+        'history_stopped': 'Поиск остановлен, найдено: ',
+        'search_panel_title': 'Результаты поиска',
+        'search_regex': 'Регулярное выражение',
+        'search_ignore_case': 'Без учёта регистра',
+        'search_whole_word': 'Слово целиком',
+        'search_regex_error': 'Ошибка в регулярном выражении',
+        'search_query': 'Запрос с условиями',
+        'search_query_help': 'слова и "фразы" — в тексте, title: — в заголовке, in:"Папка/Подпапка" — в ветке,\n'
+                             'modified:>2026-01-01, created:<=2026-02-01 — по датам, -слово — исключить',
+        'search_query_error': 'Ошибка в запросе',
+        'search_col_note': 'Заметка',
+        'search_col_path': 'Расположение',
+        'action_backup_diff': 'Сравнить бэкапы',
+        'diff_live_db': 'Текущая база данных',
+        'diff_old': 'Было:',
+        'diff_new': 'Стало:',
+        'diff_compare': 'Сравнить',
+        'diff_col_change': 'Изменение',
+        'diff_col_note': 'Заметка',
+        'diff_added': 'добавлена',
+        'diff_removed': 'удалена',
+        'diff_moved': 'перемещена',
+        'diff_renamed': 'переименована',
+        'diff_edited': 'изменена',
+        'diff_summary': 'Изменено заметок: ',
+        'diff_note_title': 'Сравнение заметки: ',
+        'diff_failed': 'Не удалось сравнить бэкапы',
         'restore_success': 'База данных успешно восстановлена',
         'language_change_message': 'Для применения нового языка интерфейса необходимо перезапустить приложение',
-        'app_already_running': 'Программа уже запущена'
+        'app_already_running': 'Программа уже запущена',
+        'status_saved': 'Сохранено в ',
+        'status_backup_progress': 'Создание бэкапа: ',
+        'status_backup_done': 'Бэкап создан: ',
+        'status_backup_failed': 'Не удалось создать бэкап'
     },
     'English': {
         'window_title': 'SkimNote',
@@ -130,8 +186,12 @@ TRANSLATIONS = {
         'action_replace_all': 'Replace All',
         'action_move_up': 'Move Up',
         'action_move_down': 'Move Down',
+        'action_cut_note': 'Cut Note',
+        'action_paste_note': 'Paste Note',
         'action_change_db': 'Change Database',
         'action_restore_db': 'Restore Database',
+        'action_backup_db': 'Create Backup',
+        'action_restore_notes': 'Restore Notes from Backup',
         'action_theme': 'Theme',
         'action_font': 'Font',
         'settings_title': 'Settings',
@@ -201,16 +261,68 @@ TRANSLATIONS = {
         'error_restore': 'Failed to restore database',
         'error_save_settings': 'Failed to save settings',
         'cannot_delete_root': 'Cannot delete root note',
+        'cannot_move_into_child': 'Cannot move a note into itself',
+        'status_note_cut': 'Note cut: ',
         'confirm_delete': 'Are you sure you want to delete this note?',
         'confirm_delete_with_children': 'This note has subnotes. They will be deleted as well.',
         'confirm_restore': 'Current database will be deleted. Continue restoration?',
         'no_search_results': 'No search results',
         'text_not_found': 'Text not found',
         'replace_count': 'Replacements made: ',
+        'replace_notes_count': 'Notes changed: ',
+        'replace_undone': 'Replace undone, notes restored: ',
+        'action_undo_replace_all': 'Undo Replace All',
         'backup_dir_not_found': 'Backup directory not found',
         'no_backups_found': 'No backups found',
+        'backup_note_count': 'notes: ',
+        'backup_size_mb': 'MB',
+        'backup_damaged': 'damaged',
+        'restore_notes_copy': 'Copy to Database',
+        'restore_notes_with_children': 'Including subnotes',
+        'restore_notes_close': 'Close',
+        'restore_notes_done': 'Copied: ',
+        'restore_notes_failed': 'Failed to copy notes from backup',
+        'action_history_search': 'Search Backups',
+        'history_search': 'Search',
+        'history_stop': 'Stop',
+        'history_col_backup': 'Backup',
+        'history_col_note': 'Note',
+        'history_col_text': 'Text',
+        'search_panel_title': 'Search Results',
+        'search_regex': 'Regular expression',
+        'search_ignore_case': 'Ignore case',
+        'search_whole_word': 'Whole word',
+        'search_regex_error': 'Invalid regular expression',
+        'search_query': 'Query with conditions',
+        'search_query_help': 'words and "phrases" — in text, title: — in title, in:"Folder/Subfolder" — in branch,\n'
+                             'modified:>2026-01-01, created:<=2026-02-01 — by date, -word — exclude',
+        'search_query_error': 'Invalid query',
+        'search_col_note': 'Note',
+        'search_col_path': 'Location',
+        'history_searching': 'Searching... found: ',
+        'history_found': 'Found: ',
+        'history_stopped': 'Search stopped, found: ',
+        'action_backup_diff': 'Compare Backups',
+        'diff_live_db': 'Current database',
+        'diff_old': 'Before:',
+        'diff_new': 'After:',
+        'diff_compare': 'Compare',
+        'diff_col_change': 'Change',
+        'diff_col_note': 'Note',
+        'diff_added': 'added',
+        'diff_removed': 'removed',
+        'diff_moved': 'moved',
+        'diff_renamed': 'renamed',
+        'diff_edited': 'edited',
+        'diff_summary': 'Changed notes: ',
+        'diff_note_title': 'Note comparison: ',
+        'diff_failed': 'Failed to compare backups',
         'restore_success': 'Database successfully restored',
         'language_change_message': 'Application needs to be restarted to apply the new language',
-        'app_already_running': 'Application is already running'
+        'app_already_running': 'Application is already running',
+        'status_saved': 'Saved at ',
+        'status_backup_progress': 'Creating backup: ',
+        'status_backup_done': 'Backup created: ',
+        'status_backup_failed': 'Backup failed'
     }
 } 
\ No newline at end of file